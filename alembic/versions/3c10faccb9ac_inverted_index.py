@@ -0,0 +1,55 @@
+"""inverted index
+
+Revision ID: 3c10faccb9ac
+Revises: 4087055c9ce4
+Create Date: 2026-10-18 11:03:27.540912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c10faccb9ac'
+down_revision: Union[str, None] = '4087055c9ce4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('''
+    create index if not exists ix_wordlocation_word_url_location
+        on wordlocation (fk_word_id, fk_url_id, location);
+    create index if not exists ix_linkbetweenurl_fk_fromurl_id
+        on linkbetweenurl (fk_fromurl_id);
+    create index if not exists ix_linkbetweenurl_fk_tourl_id
+        on linkbetweenurl (fk_tourl_id);
+    ''')
+    op.execute('''
+    create table if not exists wordposting (
+    fk_word_id integer not null constraint wordposting_wordlist_fk
+        references wordlist,
+    fk_url_id integer not null constraint wordposting_urllist_fk
+        references urllist,
+    locations integer[] not null,
+    constraint wordposting_pk primary key (fk_word_id, fk_url_id)
+    );
+    ''')
+    op.execute('''
+    insert into wordposting (fk_word_id, fk_url_id, locations)
+    select fk_word_id, fk_url_id, array_agg(distinct location order by location)
+    from wordlocation
+    where location is not null
+    group by fk_word_id, fk_url_id;
+    ''')
+
+
+def downgrade() -> None:
+    op.execute('''
+    drop table if exists wordposting;
+    drop index if exists ix_linkbetweenurl_fk_tourl_id;
+    drop index if exists ix_linkbetweenurl_fk_fromurl_id;
+    drop index if exists ix_wordlocation_word_url_location;
+    ''')
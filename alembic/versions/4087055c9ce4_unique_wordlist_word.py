@@ -0,0 +1,50 @@
+"""unique wordlist word
+
+Revision ID: 4087055c9ce4
+Revises: 87efa88a8269
+Create Date: 2026-10-18 10:12:40.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4087055c9ce4'
+down_revision: Union[str, None] = '87efa88a8269'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('''
+    create temporary table wordlist_dedup on commit drop as
+    select id, min(id) over (partition by word) as keep_id
+    from wordlist;
+    ''')
+    op.execute('''
+    update wordlocation set fk_word_id = d.keep_id
+    from wordlist_dedup d
+    where wordlocation.fk_word_id = d.id and d.id <> d.keep_id;
+    ''')
+    op.execute('''
+    update linkword set fk_word_id = d.keep_id
+    from wordlist_dedup d
+    where linkword.fk_word_id = d.id and d.id <> d.keep_id;
+    ''')
+    op.execute('''
+    delete from wordlist
+    using wordlist_dedup d
+    where wordlist.id = d.id and d.id <> d.keep_id;
+    ''')
+    op.execute('''
+    alter table wordlist add constraint wordlist_word_key unique (word);
+    ''')
+
+
+def downgrade() -> None:
+    op.execute('''
+    alter table wordlist drop constraint if exists wordlist_word_key;
+    ''')
@@ -0,0 +1,32 @@
+"""page text
+
+Revision ID: 5e2d7a1c9b40
+Revises: 91cbf2ed5929
+Create Date: 2026-10-18 16:05:41.218377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2d7a1c9b40'
+down_revision: Union[str, None] = '91cbf2ed5929'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('''
+    create table if not exists pagetext (
+    url_id integer constraint pagetext_pk primary key
+        constraint pagetext_urllist_fk references urllist,
+    text text not null
+    );
+    ''')
+
+
+def downgrade() -> None:
+    op.execute('drop table if exists pagetext;')
@@ -0,0 +1,44 @@
+"""url fetch metadata
+
+Revision ID: 767af93cf927
+Revises: c8b0ccb2fbb6
+Create Date: 2026-10-18 14:48:51.203117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '767af93cf927'
+down_revision: Union[str, None] = 'c8b0ccb2fbb6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('''
+    alter table urllist
+        add column if not exists etag varchar,
+        add column if not exists last_modified varchar,
+        add column if not exists content_hash varchar(64),
+        add column if not exists fetched_at timestamp;
+    ''')
+    op.execute('''
+    create index if not exists ix_wordlocation_fk_url_id on wordlocation (fk_url_id);
+    create index if not exists ix_wordposting_fk_url_id on wordposting (fk_url_id);
+    ''')
+
+
+def downgrade() -> None:
+    op.execute('''
+    drop index if exists ix_wordposting_fk_url_id;
+    drop index if exists ix_wordlocation_fk_url_id;
+    alter table urllist
+        drop column if exists fetched_at,
+        drop column if exists content_hash,
+        drop column if exists last_modified,
+        drop column if exists etag;
+    ''')
@@ -0,0 +1,35 @@
+"""url simhash
+
+Revision ID: 91cbf2ed5929
+Revises: 767af93cf927
+Create Date: 2026-10-18 15:30:12.664052
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '91cbf2ed5929'
+down_revision: Union[str, None] = '767af93cf927'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('''
+    alter table urllist
+        add column if not exists simhash bigint,
+        add column if not exists duplicate_of integer
+            constraint urllist_duplicate_of_urllist_fk references urllist;
+    ''')
+
+
+def downgrade() -> None:
+    op.execute('''
+    alter table urllist
+        drop column if exists duplicate_of,
+        drop column if exists simhash;
+    ''')
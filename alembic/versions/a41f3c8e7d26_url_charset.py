@@ -0,0 +1,32 @@
+"""url charset
+
+Revision ID: a41f3c8e7d26
+Revises: 5e2d7a1c9b40
+Create Date: 2026-10-18 16:42:08.935114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41f3c8e7d26'
+down_revision: Union[str, None] = '5e2d7a1c9b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('''
+    alter table urllist
+        add column if not exists charset varchar;
+    ''')
+
+
+def downgrade() -> None:
+    op.execute('''
+    alter table urllist
+        drop column if exists charset;
+    ''')
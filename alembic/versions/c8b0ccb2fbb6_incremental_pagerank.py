@@ -0,0 +1,53 @@
+"""incremental pagerank
+
+Revision ID: c8b0ccb2fbb6
+Revises: 3c10faccb9ac
+Create Date: 2026-10-18 12:21:05.774310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8b0ccb2fbb6'
+down_revision: Union[str, None] = '3c10faccb9ac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('''
+    create table if not exists pagerank (
+    url_id integer constraint pagerank_pk primary key
+        constraint pagerank_urllist_fk references urllist,
+    rank float not null
+    );
+    ''')
+    op.execute('''
+    create table if not exists pagerankstate (
+    id integer constraint pagerankstate_pk primary key,
+    edge_watermark integer not null,
+    edge_count integer not null,
+    iterations integer not null,
+    updated_at timestamp not null default now()
+    );
+    ''')
+    op.execute('''
+    delete from metrics m
+    using metrics newer
+    where m.url_id = newer.url_id and m.id < newer.id;
+    ''')
+    op.execute('''
+    alter table metrics add constraint metrics_url_id_key unique (url_id);
+    ''')
+
+
+def downgrade() -> None:
+    op.execute('''
+    alter table metrics drop constraint if exists metrics_url_id_key;
+    drop table if exists pagerankstate;
+    drop table if exists pagerank;
+    ''')
@@ -0,0 +1,31 @@
+"""metrics ranking index
+
+Revision ID: e7b92d4f1a83
+Revises: a41f3c8e7d26
+Create Date: 2026-10-18 17:20:54.410729
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b92d4f1a83'
+down_revision: Union[str, None] = 'a41f3c8e7d26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('''
+    create index if not exists ix_metrics_result_metric_url
+        on metrics (result_metric desc nulls last, url_id);
+    ''')
+
+
+def downgrade() -> None:
+    op.execute('''
+    drop index if exists ix_metrics_result_metric_url;
+    ''')
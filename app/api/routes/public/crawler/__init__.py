@@ -4,6 +4,8 @@ from .get_words import *
 from .search import *
 from .calc_metrics import *
 from .generate_html import *
+from .jobs import *
+from .metrics import *
 from .router import crawler_router
 
 __all__ = [
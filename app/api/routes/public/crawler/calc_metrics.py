@@ -1,7 +1,7 @@
-from fastapi import Depends
+from fastapi import Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.crawler import calc_metrics
+from app.crawler import calc_metrics, ScoreWeights
 from app.database import get_db
 from .router import crawler_router
 
@@ -10,5 +10,9 @@ from .router import crawler_router
     "/calc_metrics",
     response_model=None
 )
-async def get_calc_metrics(db: AsyncSession = Depends(get_db)):
-    return await calc_metrics(db)
+async def get_calc_metrics(words: list[str] = Query(...), incremental: bool = True,
+                           frequency_weight: float = Query(1.0, ge=0),
+                           pagerank_weight: float = Query(1.0, ge=0),
+                           db: AsyncSession = Depends(get_db)):
+    weights = ScoreWeights(frequency=frequency_weight, pagerank=pagerank_weight)
+    return await calc_metrics(db, words, incremental=incremental, weights=weights)
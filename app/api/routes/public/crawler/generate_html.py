@@ -1,15 +1,21 @@
-from fastapi.params import Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Query
+from fastapi.responses import StreamingResponse
 
-from app.crawler import generate_html_report
-from app.database import get_db
+from app.crawler import generate_html_report, REPORT_LIMIT, REPORT_MAX_LIMIT
 from .router import crawler_router
 
 
 
 @crawler_router.get(
     "/html_page",
-    response_model=None
+    response_class=StreamingResponse
 )
-async def get_generated_html_file(db: AsyncSession = Depends(get_db)):
-    return await generate_html_report(db)
\ No newline at end of file
+async def get_generated_html_file(
+        limit: int = Query(REPORT_LIMIT, ge=1, le=REPORT_MAX_LIMIT),
+        offset: int = Query(0, ge=0),
+        words: list[str] | None = Query(None)
+):
+    return StreamingResponse(
+        generate_html_report(limit, offset, words),
+        media_type="text/html"
+    )
@@ -1,12 +1,10 @@
 from http import HTTPStatus
 
-import aiohttp
-
 from app.crawler import get_links
+from app.politeness import create_session
 from .router import crawler_router
 from fastapi import Request
 import app.dto.responses as responses
-from app.redis import redis_service
 
 
 @crawler_router.get(
@@ -15,8 +13,7 @@ from app.redis import redis_service
     status_code=HTTPStatus.OK
 )
 async def get_links_from_url(request: Request, url: str):
-    await redis_service.delete_visited_urls()
-    async with aiohttp.ClientSession() as session:
+    async with create_session() as session:
         links = await get_links(session, url=url)
     validated_model = responses.GetLinksResponse.model_validate({
         "links": links
@@ -1,7 +1,7 @@
-import aiohttp
 from fastapi import Body
 
 from app.crawler import get_words
+from app.politeness import create_session
 from .router import crawler_router
 
 
@@ -12,6 +12,6 @@ from .router import crawler_router
     response_model=list[tuple] | None
 )
 async def get_words_on_url(url: str = Body(...)):
-    async with aiohttp.ClientSession() as session:
+    async with create_session() as session:
         words = await get_words(session=session,url=url)
     return words
\ No newline at end of file
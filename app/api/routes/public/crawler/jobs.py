@@ -0,0 +1,44 @@
+from fastapi import HTTPException
+from starlette import status
+
+from app.frontier import CrawlFrontier
+from .router import crawler_router
+import app.dto.responses as responses
+
+
+@crawler_router.get(
+    "/jobs",
+    response_model=list[responses.CrawlJobResponse],
+    status_code=status.HTTP_200_OK
+)
+async def list_crawl_jobs():
+    jobs = []
+    for frontier in await CrawlFrontier.running_jobs():
+        stats = await frontier.stats()
+        if stats is not None:
+            jobs.append(stats)
+    return jobs
+
+
+@crawler_router.get(
+    "/jobs/{job_id}",
+    response_model=responses.CrawlJobResponse,
+    status_code=status.HTTP_200_OK
+)
+async def get_crawl_job(job_id: str):
+    stats = await CrawlFrontier(job_id).stats()
+    if stats is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Crawl job not found")
+    return stats
+
+
+@crawler_router.delete(
+    "/jobs/{job_id}",
+    response_model=responses.CrawlJobResponse,
+    status_code=status.HTTP_200_OK
+)
+async def cancel_crawl_job(job_id: str):
+    frontier = CrawlFrontier(job_id)
+    if not await frontier.cancel() and await frontier.status() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Crawl job not found")
+    return await frontier.stats()
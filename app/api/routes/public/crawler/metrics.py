@@ -0,0 +1,22 @@
+from fastapi import Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crawler import get_sorted_metrics, METRICS_LIMIT
+from app.database import get_db
+from .router import crawler_router
+import app.dto.responses as responses
+
+
+@crawler_router.get(
+    "/metrics",
+    response_model=list[responses.MetricResponse]
+)
+async def get_metrics(
+        limit: int = Query(METRICS_LIMIT, gt=0, le=1000),
+        offset: int = Query(0, ge=0),
+        db: AsyncSession = Depends(get_db)
+):
+    return [
+        responses.MetricResponse(url_id=url_id, result_metric=result_metric)
+        for url_id, result_metric in await get_sorted_metrics(db, limit, offset)
+    ]
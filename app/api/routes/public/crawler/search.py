@@ -1,23 +1,40 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.crawler import populate_matchrows
+from app.crawler import search_pages, ScoreWeights, SEARCH_LIMIT
 from app.database import get_db
 from .router import crawler_router
 from pydantic import BaseModel, Field
 from fastapi import Body, Depends
+import app.dto.responses as responses
+
+
+class SearchWeights(BaseModel):
+    frequency: float = Field(default=1.0, ge=0)
+    location: float = Field(default=1.0, ge=0)
+    distance: float = Field(default=1.0, ge=0)
 
 
 class SearchRequest(BaseModel):
-    first_word: str
-    second_word: str
+    words: list[str] = Field(default_factory=list)
+    first_word: str | None = None
+    second_word: str | None = None
+    limit: int = Field(default=SEARCH_LIMIT, gt=0, le=1000)
+    offset: int = Field(default=0, ge=0)
+    weights: SearchWeights = Field(default_factory=SearchWeights)
+
+    def query_words(self) -> list[str]:
+        return [*self.words, *(word for word in (self.first_word, self.second_word) if word)]
 
 
 
 @crawler_router.post(
     "/search",
-    response_model=None
+    response_model=list[responses.SearchResult]
 )
 async def search_words(body: SearchRequest = Body(...), db: AsyncSession = Depends(get_db)):
-    return await populate_matchrows(body.first_word, body.second_word, db)
-
-
+    return await search_pages(
+        body.query_words(), db,
+        limit=body.limit,
+        offset=body.offset,
+        weights=ScoreWeights(**body.weights.model_dump())
+    )
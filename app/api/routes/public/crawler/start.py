@@ -1,19 +1,22 @@
-import asyncio
-
-import aiohttp
-from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.crawler import get_links, crawl
-from app.database import get_db
+from app.crawler import (
+    crawl, create_crawl_job, CRAWL_MAX_DEPTH, CRAWL_CONCURRENCY, MAX_CRAWL_CONCURRENCY
+)
+from app.politeness import create_session
 from .router import crawler_router
-from fastapi import Request, Depends, BackgroundTasks
+from fastapi import Request, BackgroundTasks, Query, HTTPException
 import app.dto.responses as responses
 
 
-async def background_crawl(url: str, db: AsyncSession):
-    async with aiohttp.ClientSession() as session:
-        await crawl(url, db, session)
+async def background_crawl(
+        url: str,
+        max_depth: int = CRAWL_MAX_DEPTH,
+        concurrency: int = CRAWL_CONCURRENCY,
+        job_id: str | None = None
+):
+    async with create_session() as session:
+        await crawl(url, session, max_depth=max_depth, concurrency=concurrency, job_id=job_id)
 
 
 @crawler_router.post(
@@ -22,6 +25,15 @@ async def background_crawl(url: str, db: AsyncSession):
     status_code=status.HTTP_200_OK
 )
 async def start_crawler(request: Request, url: str, background_tasks: BackgroundTasks,
-                        db: AsyncSession = Depends(get_db)):
-    background_tasks.add_task(background_crawl, url, db)
-    return {"message": "Crawling started!"}
+                        max_depth: int = Query(CRAWL_MAX_DEPTH, ge=1),
+                        concurrency: int = Query(CRAWL_CONCURRENCY, ge=1, le=MAX_CRAWL_CONCURRENCY),
+                        distributed: bool = False):
+    try:
+        frontier = await create_crawl_job(url, max_depth, concurrency, distributed)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    if distributed:
+        # only seed the shared frontier; `python worker.py` processes do the crawling
+        return {"message": "Crawl queued!", "job_id": frontier.job_id}
+    background_tasks.add_task(background_crawl, url, max_depth, concurrency, frontier.job_id)
+    return {"message": "Crawling started!", "job_id": frontier.job_id}
@@ -3,6 +3,7 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 from .routes import global_router
+from ..crawler import resume_crawls, shutdown_parser_pool
 from ..redis import redis_service
 
 
@@ -23,8 +24,11 @@ def init_middlewares(_app: FastAPI):
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
     await redis_service.init_redis()
-    await redis_service.delete_visited_urls()
+    tasks = await resume_crawls()
     yield
+    for task in tasks:
+        task.cancel()
+    shutdown_parser_pool()
 
 
 def create_application():
@@ -0,0 +1,64 @@
+import gzip
+import os
+import tempfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CONTENT_STORE_DIR = os.environ.get("CONTENT_STORE_DIR", "pages")
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+
+
+# raw page bodies, compressed and addressed by their sha256 content hash;
+# two levels of prefix directories keep any one directory small
+class ContentStore:
+    def __init__(self, root: str = CONTENT_STORE_DIR):
+        self.root = root
+        self.extension = ".zst" if zstandard is not None else ".gz"
+
+    def path(self, content_hash: str, extension: str | None = None) -> str:
+        return os.path.join(
+            self.root, content_hash[:2], content_hash[2:4], content_hash + (extension or self.extension)
+        )
+
+    def compress(self, body: bytes) -> bytes:
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+    def put(self, content_hash: str, body: bytes) -> None:
+        path = self.path(content_hash)
+        if os.path.exists(path):
+            return
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # write then rename, so readers never see a half-written blob
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.compress(body))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, content_hash: str) -> bytes | None:
+        # blobs written before zstandard was installed stay readable
+        for extension in (".zst", ".gz"):
+            path = self.path(content_hash, extension)
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            if extension == ".gz":
+                return gzip.decompress(data)
+            if zstandard is None:
+                raise RuntimeError(f"zstandard is required to read {path}")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return None
+
+
+content_store = ContentStore()
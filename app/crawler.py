@@ -1,369 +1,1019 @@
 import asyncio
-from collections import defaultdict
-from urllib.parse import urlparse, urlunparse, urljoin
+import hashlib
+import html
+import json
+import heapq
+import multiprocessing
+import os
+from array import array
+from bisect import bisect_left
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from dataclasses import dataclass, asdict
 
 import aiohttp
-from bs4 import BeautifulSoup
-from sqlalchemy import select, or_, func, distinct
+import asyncpg
+import numpy as np
+from sqlalchemy import select, update, delete, or_, func, distinct, bindparam, Integer, Float
+from sqlalchemy.dialects.postgresql import insert as pg_insert, aggregate_order_by, ARRAY
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models import WordList, UrlList, WordLocation, LinkBetweenUrl, LinkWord, MatchRows, Metrics
+from app import pagerank
+from app.content_store import content_store
+from app.database import async_session
+from app.frontier import CrawlFrontier
+from app.parsers import parse_html
+from app.politeness import host_scheduler, create_session
+from app.query_cache import query_cache
+from app.lru import LRUCache
+from app.models import (
+    WordList, UrlList, WordLocation, WordPosting, LinkBetweenUrl, LinkWord, Metrics, PageRank, PageRankState,
+    PageText
+)
 import re
 
-from app.redis import redis_service
+from app.simhash import simhash, simhash_index, to_signed
+from app.urls import canonicalize_url, canonicalize_link
+from app.writer import ResultWriter
 
 STOP_WORDS = {"и", "но", "на", "за", "в", "с", "о", "к", "по", "для", "от"}
+CRAWL_MAX_DEPTH = 10
+CRAWL_CONCURRENCY = 20
+MAX_CRAWL_CONCURRENCY = 200
+ID_BATCH_SIZE = 1000
+INSERT_BATCH_SIZE = 5000
+STORE_POSTING_LISTS = True
+SEARCH_LIMIT = 100
+METRICS_LIMIT = 100
+PAGERANK_STATE_ID = 1
+FRONTIER_POLL_INTERVAL = 0.5
+MAX_BODY_SIZE = 5 * 1024 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml"}
+PARSER_WORKERS = os.cpu_count() or 1
+DETECT_NEAR_DUPLICATES = True
+STORE_PAGE_TEXT = True
+STORE_RAW_PAGES = True
+PAGE_TEXT_LIMIT = 20_000
+REPORT_LIMIT = 50
+REPORT_MAX_LIMIT = 1000
+HIGHLIGHT_CACHE_SIZE = 256
+REPORT_HIGHLIGHT_WORDS = ["деятельность", "редактора"]
+word_id_cache = LRUCache(maxsize=200_000)
+url_id_cache = LRUCache(maxsize=200_000)
 processed_urls = set()
+crawl_tasks: set[asyncio.Task] = set()
+parser_pool: ProcessPoolExecutor | None = None
+
+
+@dataclass
+class Page:
+    url: str
+    links: list[str]
+    # tokens travel between processes as two flat int arrays over a
+    # per-page vocabulary instead of one tuple object per occurrence
+    vocabulary: list[str]
+    word_index: array
+    positions: array
+    size: int = 0
+    # whitespace-collapsed page text kept for reports, capped at PAGE_TEXT_LIMIT
+    text: str = ""
+    etag: str | None = None
+    last_modified: str | None = None
+    content_hash: str | None = None
+    charset: str | None = None
+    # None means now; re-indexing keeps the original fetch time
+    fetched_at: datetime | None = None
+    # set when the server or the content hash says nothing changed since the
+    # last fetch: links come from the index and nothing is re-tokenized
+    unchanged: bool = False
+    fingerprint: int | None = None
+    # near-duplicate pages keep their links but are not indexed
+    duplicate_of: str | None = None
+
+    def drop_words(self) -> None:
+        self.vocabulary = []
+        self.text = ""
+        self.word_index = array('I')
+        self.positions = array('I')
+
+    @property
+    def words(self) -> list[tuple[str, int]]:
+        vocabulary = self.vocabulary
+        return [(vocabulary[i], position) for i, position in zip(self.word_index, self.positions)]
+
+
+@dataclass
+class FetchMetadata:
+    url_id: int
+    etag: str | None
+    last_modified: str | None
+    content_hash: str
+
+
+async def load_fetch_metadata(url: str) -> FetchMetadata | None:
+    stmt = (
+        select(UrlList.id, UrlList.etag, UrlList.last_modified, UrlList.content_hash)
+        .where(UrlList.url == url, UrlList.content_hash.is_not(None))
+    )
+    async with async_session() as db:
+        row = (await db.execute(stmt)).first()
+    return FetchMetadata(*row) if row else None
 
 
-def is_absolute_url(url: str) -> bool:
-    return bool(urlparse(url).netloc)
+async def load_outbound_links(url_id: int) -> list[str]:
+    stmt = (
+        select(UrlList.url)
+        .join(LinkBetweenUrl, LinkBetweenUrl.fk_tourl_id == UrlList.id)
+        .where(LinkBetweenUrl.fk_fromurl_id == url_id)
+        .distinct()
+    )
+    async with async_session() as db:
+        return list((await db.execute(stmt)).scalars())
+
+
+def extract_links(hrefs: list[str], url: str) -> list[str]:
+    links = {}
+    for href in hrefs:
+        link = canonicalize_link(href, url)
+        if link is not None and link not in links:
+            links[link] = None
+    return list(links.keys())
+
+
+def tokenize(page_text: str) -> tuple[list[str], array, array]:
+    words = re.findall(r'\b[a-zA-Zа-яА-Я]+\b', page_text.lower())
+
+    vocabulary = {}
+    word_index = array('I')
+    positions = array('I')
+    for idx, word in enumerate(words):
+        if word not in STOP_WORDS:
+            word_index.append(vocabulary.setdefault(word, len(vocabulary)))
+            positions.append(idx)
+    return list(vocabulary), word_index, positions
+
+
+def parse_page(body: bytes, url: str, encoding: str | None = None) -> Page:
+    parsed = parse_html(body, encoding)
+    # postgres text columns reject NUL, and html.parser keeps it verbatim
+    text = parsed.text.replace("\x00", " ")
+    vocabulary, word_index, positions = tokenize(text)
+    return Page(
+        url=url,
+        links=extract_links(parsed.hrefs, url),
+        vocabulary=vocabulary,
+        word_index=word_index,
+        positions=positions,
+        size=len(body),
+        text=" ".join(text.split())[:PAGE_TEXT_LIMIT] if STORE_PAGE_TEXT else "",
+        fingerprint=simhash([vocabulary[i] for i in word_index])
+    )
+
 
+def get_parser_pool() -> ProcessPoolExecutor:
+    global parser_pool
+    if parser_pool is None:
+        # spawn: forking a process that runs an event loop and driver threads is unsafe
+        parser_pool = ProcessPoolExecutor(
+            max_workers=PARSER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return parser_pool
 
-def normalize_url(url: str, base_url: str = None) -> str:
-    if url.startswith("//"):
-        url = "https:" + url
 
-    parsed_url = urlparse(url)
-    normalized_url = urlunparse((
-        parsed_url.scheme,
-        parsed_url.netloc,
-        parsed_url.path.rstrip('/'),
-        parsed_url.params,
-        parsed_url.query,
-        parsed_url.fragment
-    ))
+def shutdown_parser_pool() -> None:
+    global parser_pool
+    if parser_pool is not None:
+        parser_pool.shutdown(cancel_futures=True)
+        parser_pool = None
 
-    if base_url and not is_absolute_url(normalized_url):
-        normalized_url = urljoin(base_url, normalized_url)
 
-    return normalized_url
+async def parse_page_async(body: bytes, url: str, encoding: str | None = None) -> Page:
+    if not PARSER_WORKERS:
+        return parse_page(body, url, encoding)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_parser_pool(), parse_page, body, url, encoding)
 
 
-async def get_words(
+async def read_html(response: aiohttp.ClientResponse, max_size: int = MAX_BODY_SIZE) -> bytes | None:
+    if response.content_type not in HTML_CONTENT_TYPES:
+        print(f"SKIPPING {response.url}: CONTENT TYPE {response.content_type}")
+        return None
+
+    body = bytearray()
+    async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+        body.extend(chunk)
+        if len(body) >= max_size:
+            print(f"TRUNCATING {response.url} AT {max_size} BYTES")
+            del body[max_size:]
+            break
+    return bytes(body)
+
+
+async def unchanged_page(
+        url: str,
+        metadata: FetchMetadata,
+        response: aiohttp.ClientResponse,
+        size: int = 0
+) -> Page:
+    return Page(
+        url=url,
+        links=await load_outbound_links(metadata.url_id),
+        vocabulary=[],
+        word_index=array('I'),
+        positions=array('I'),
+        size=size,
+        etag=response.headers.get("ETag", metadata.etag),
+        last_modified=response.headers.get("Last-Modified", metadata.last_modified),
+        content_hash=metadata.content_hash,
+        unchanged=True
+    )
+
+
+async def fetch_page(
         session: aiohttp.ClientSession,
-        url: str
-) -> list[tuple[str, int]]:
-    print("START GET WORDS")
-    async with session.get(url, headers={'User-Agent': 'Mozilla/5'}) as response:
+        url: str,
+        metadata: FetchMetadata | None = None,
+        store_raw: bool = False
+) -> Page | None:
+    print(f"START FETCH PAGE: {url}")
+    if not await host_scheduler.allowed(session, url):
+        print(f"URL {url} IS DISALLOWED BY ROBOTS.TXT")
+        return None
+
+    headers = {}
+    if metadata is not None:
+        if metadata.etag:
+            headers["If-None-Match"] = metadata.etag
+        if metadata.last_modified:
+            headers["If-Modified-Since"] = metadata.last_modified
+
+    await host_scheduler.wait(url)
+    async with session.get(url, headers=headers) as response:
+        if response.status == 304 and metadata is not None:
+            print(f"NOT MODIFIED: {url}")
+            return await unchanged_page(url, metadata, response)
         if response.status == 200:
-            text = await response.text()
-            soup = BeautifulSoup(text, "html.parser")
-            page_text = soup.get_text(separator=' ')
+            body = await read_html(response)
+            if body is None:
+                return None
+            content_hash = hashlib.sha256(body).hexdigest()
+            if store_raw:
+                await asyncio.to_thread(content_store.put, content_hash, body)
+            if metadata is not None and metadata.content_hash == content_hash:
+                print(f"CONTENT UNCHANGED: {url}")
+                return await unchanged_page(url, metadata, response, len(body))
+
+            page = await parse_page_async(body, url, response.charset)
+            page.etag = response.headers.get("ETag")
+            page.last_modified = response.headers.get("Last-Modified")
+            page.content_hash = content_hash
+            page.charset = response.charset
+            print(f"END FETCH PAGE: {url}")
+            return page
 
-            words = re.findall(r'\b[a-zA-Zа-яА-Я]+\b', page_text.lower())
 
-            clean_words_with_positions = [(word, idx) for idx, word in enumerate(words) if word not in STOP_WORDS]
-            print("END GET WORDS")
-            return clean_words_with_positions
+async def get_words(
+        session: aiohttp.ClientSession,
+        url: str
+) -> list[tuple[str, int]]:
+    page = await fetch_page(session, url)
+    if page is not None:
+        return page.words
 
 
 async def get_links(
         session: aiohttp.ClientSession,
         url: str
 ) -> list[str]:
-    print("START GET LINKS")
-    async with session.get(url, headers={'User-Agent': 'Mozilla/5'}) as response:
-        if response.status == 200:
-            text = await response.text()
-            soup = BeautifulSoup(text, "html.parser")
-            links = {}
-            for a_tag in soup.find_all('a', href=True):
-                link = a_tag['href']
-                if not is_absolute_url(link):
-                    link = urljoin(url, link)
+    page = await fetch_page(session, url)
+    if page is not None:
+        return page.links
 
-                normalized_link = normalize_url(link, url)
 
-                if is_absolute_url(normalized_link) and normalized_link not in links:
-                    links[normalized_link] = None
-            print("END GET LINKS")
-            return list(links.keys())
+def chunked(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
 
-async def store_words(
-        words: list[tuple[str, int]],
-        url_id: int,
+async def resolve_ids(
+        model,
+        column,
+        values: set[str],
+        cache: LRUCache,
         db: AsyncSession
-) -> None:
-    print("START STORE WORDS")
-    for word, position in words:
-        word_model = WordList(word=word)
-        db.add(word_model)
-        await db.flush()
+) -> dict[str, int]:
+    ids = {}
+    missing = []
+    for value in values:
+        value_id = cache.get(value)
+        if value_id is None:
+            missing.append(value)
+        else:
+            ids[value] = value_id
+
+    # sorted so concurrent writers lock conflicting rows in the same order
+    for batch in chunked(sorted(missing), ID_BATCH_SIZE):
+        stmt = (
+            pg_insert(model)
+            .values([{column.key: value} for value in batch])
+            .on_conflict_do_nothing(index_elements=[column])
+            .returning(model.id, column)
+        )
+        result = await db.execute(stmt)
+        inserted = {value: value_id for value_id, value in result}
+        ids.update(inserted)
 
-        word_location = WordLocation(fk_word_id=word_model.id, fk_url_id=url_id, location=position)
-        db.add(word_location)
+        existing = [value for value in batch if value not in inserted]
+        if existing:
+            stmt = select(model.id, column).where(column.in_(existing))
+            result = await db.execute(stmt)
+            ids.update({value: value_id for value_id, value in result})
 
-        link_word = LinkWord(fk_word_id=word_model.id, fk_link_id=url_id)
-        db.add(link_word)
+    return ids
 
-    await db.commit()
-    print("END STORE WORDS")
+
+async def resolve_word_ids(
+        words: set[str],
+        db: AsyncSession
+) -> dict[str, int]:
+    return await resolve_ids(WordList, WordList.word, words, word_id_cache, db)
 
 
-async def store_links(
-        links: list[str],
-        from_url_id: int,
+async def resolve_url_ids(
+        urls: set[str],
         db: AsyncSession
+) -> dict[str, int]:
+    return await resolve_ids(UrlList, UrlList.url, urls, url_id_cache, db)
+
+
+async def copy_records(
+        db: AsyncSession,
+        model,
+        columns: list[str],
+        records: list[tuple]
 ) -> None:
-    print("START STORE LINKS")
-    for link in links:
-        stmt = select(UrlList).where(UrlList.url == link)
-        result = await db.execute(stmt)
-        link_model = result.scalars().first()
+    if not records:
+        return
+    # COPY through the session's own connection, inside its transaction
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        model.__tablename__, records=records, columns=columns
+    )
 
-        if not link_model:
-            link_model = UrlList(url=link)
-            db.add(link_model)
-            await db.flush()
 
-        link_between = LinkBetweenUrl(
-            fk_fromurl_id=from_url_id,
-            fk_tourl_id=link_model.id
+async def store_postings(postings: list[tuple[int, int, list[int]]], db: AsyncSession) -> None:
+    # sorted so concurrent writers lock conflicting rows in the same order
+    postings.sort(key=lambda posting: (posting[0], posting[1]))
+    for batch in chunked(postings, INSERT_BATCH_SIZE):
+        stmt = pg_insert(WordPosting).values([
+            {"fk_word_id": word_id, "fk_url_id": url_id, "locations": locations}
+            for word_id, url_id, locations in batch
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WordPosting.fk_word_id, WordPosting.fk_url_id],
+            set_={"locations": stmt.excluded.locations}
+        )
+        await db.execute(stmt)
+
+
+async def delete_page_index(url_ids: list[int], db: AsyncSession) -> None:
+    edge_ids = select(LinkBetweenUrl.id).where(LinkBetweenUrl.fk_fromurl_id.in_(url_ids))
+    await db.execute(delete(LinkWord).where(LinkWord.fk_link_id.in_(edge_ids)))
+    await db.execute(delete(LinkBetweenUrl).where(LinkBetweenUrl.fk_fromurl_id.in_(url_ids)))
+    await db.execute(delete(WordLocation).where(WordLocation.fk_url_id.in_(url_ids)))
+    await db.execute(delete(WordPosting).where(WordPosting.fk_url_id.in_(url_ids)))
+    await db.execute(delete(PageText).where(PageText.url_id.in_(url_ids)))
+
+
+async def store_pages(pages: list[Page], db: AsyncSession) -> None:
+    pages = list({page.url: page for page in pages}.values())
+    changed = [page for page in pages if not page.unchanged]
+    print(f"START STORE {len(pages)} PAGES, {len(changed)} CHANGED")
+
+    urls = {page.url for page in pages}
+    urls.update(link for page in changed for link in page.links)
+    urls.update(page.duplicate_of for page in changed if page.duplicate_of)
+    url_ids = await resolve_url_ids(urls, db)
+    word_ids = await resolve_word_ids({word for page in changed for word in page.vocabulary}, db)
+
+    edges = []
+    locations = []
+    postings = []
+    texts = []
+    for page in changed:
+        url_id = url_ids[page.url]
+        edges.extend((url_id, url_ids[link]) for link in page.links)
+        if page.text:
+            texts.append((url_id, page.text))
+
+        page_word_ids = [word_ids[word] for word in page.vocabulary]
+        locations.extend(
+            (page_word_ids[i], url_id, position)
+            for i, position in zip(page.word_index, page.positions)
         )
-        db.add(link_between)
+        if STORE_POSTING_LISTS:
+            positions = [[] for _ in page.vocabulary]
+            for i, position in zip(page.word_index, page.positions):
+                positions[i].append(position)
+            postings.extend(zip(page_word_ids, [url_id] * len(positions), positions))
+
+    if changed:
+        # a re-fetched page replaces whatever the previous fetch indexed
+        await delete_page_index(sorted(url_ids[page.url] for page in changed), db)
+    await copy_records(db, LinkBetweenUrl, ["fk_fromurl_id", "fk_tourl_id"], edges)
+    await copy_records(db, WordLocation, ["fk_word_id", "fk_url_id", "location"], locations)
+    if postings:
+        await store_postings(postings, db)
+    await copy_records(db, PageText, ["url_id", "text"], texts)
+
+    fetched_at = datetime.now()
+    metadata = []
+    for page in sorted(pages, key=lambda page: url_ids[page.url]):
+        row = {
+            "id": url_ids[page.url],
+            "etag": page.etag,
+            "last_modified": page.last_modified,
+            "content_hash": page.content_hash,
+            "fetched_at": page.fetched_at or fetched_at
+        }
+        if not page.unchanged:
+            row["charset"] = page.charset
+            row["simhash"] = to_signed(page.fingerprint) if page.fingerprint is not None else None
+            row["duplicate_of"] = url_ids[page.duplicate_of] if page.duplicate_of else None
+        metadata.append(row)
+    await db.execute(update(UrlList), metadata)
 
     await db.commit()
-    print("END STORE LINKS")
+    # only ids from a committed transaction are safe to reuse
+    url_id_cache.update(url_ids)
+    word_id_cache.update(word_ids)
+    if changed:
+        await query_cache.bump_generation()
+    print(f"END STORE {len(pages)} PAGES")
+
+
+async def write_pages(pages: list[Page]) -> None:
+    try:
+        async with async_session() as db:
+            await store_pages(pages, db)
+    except (IntegrityError, asyncpg.IntegrityConstraintViolationError):
+        # a cached id may point at a row deleted since (reindex --prune-words);
+        # forget them all so the retry resolves ids from the database again
+        word_id_cache.clear()
+        url_id_cache.clear()
+        raise
+
+
+async def check_near_duplicate(page: Page) -> None:
+    duplicate_of = await simhash_index.find_duplicate(page.fingerprint, page.url)
+    if duplicate_of is None:
+        await simhash_index.add(page.fingerprint, page.url)
+        return
+    print(f"URL {page.url} IS A NEAR-DUPLICATE OF {duplicate_of}, SKIPPING INDEXING")
+    page.duplicate_of = duplicate_of
+    page.drop_words()
 
 
-async def crawl(
-        url: str,
-        db: AsyncSession,
+async def crawl_frontier_item(
+        frontier: CrawlFrontier,
+        item: tuple[str, int, str],
+        max_depth: int,
         session: aiohttp.ClientSession,
-        depth: int = 0
-):
-    if depth >= 10:
+        writer: ResultWriter
+) -> None:
+    page_url, depth, token = item
+    print(f"START CRAWLING URL: {page_url}")
+    lease = frontier.hold(page_url, token)
+
+    async def complete(failed: bool = False):
+        lease.cancel()
+        await frontier.complete(page_url, token, failed=failed)
+
+    try:
+        metadata = await load_fetch_metadata(page_url)
+        page = await fetch_page(session, page_url, metadata, store_raw=STORE_RAW_PAGES)
+        if page is None:
+            print(f"ON URL: {page_url} NOT FOUND LINKS!")
+            await frontier.record_skipped()
+            await complete()
+            return
+
+        await frontier.record_page(page.size)
+        if DETECT_NEAR_DUPLICATES and not page.unchanged and page.fingerprint is not None:
+            await check_near_duplicate(page)
+        # children are queued before the page is completed, so the job can
+        # never look empty while this page is still producing work
+        if depth + 1 < max_depth:
+            await frontier.push(page.links, depth + 1)
+    except asyncio.CancelledError:
+        lease.cancel()
+        raise
+    except Exception as e:
+        print(f"ERROR CRAWLING URL {page_url}: {e}")
+        await frontier.record_error()
+        await complete(failed=True)
         return
-    print(f"START CRAWLING URL: {url}")
 
-    normalized_url = normalize_url(url)
+    async def written(ok: bool):
+        # the url only leaves the in-flight set once its rows are committed
+        if not ok:
+            await frontier.record_error()
+        await complete(failed=not ok)
 
-    res = await redis_service.is_url_cached(normalized_url)
-    if res:
-        print(f"URL {normalized_url} уже обработан, пропускаем.")
-        return
+    await writer.put(page, written)
 
-    await redis_service.cache_url(normalized_url)
 
-    stmt = select(UrlList).where(UrlList.url == normalized_url)
-    result = await db.execute(stmt)
-    url_model = result.scalars().first()
+def create_writer() -> ResultWriter:
+    return ResultWriter(write_pages).start()
 
-    if not url_model:
-        url_model = UrlList(url=normalized_url)
-        db.add(url_model)
-        await db.flush()
 
-    links = await get_links(session, url)
-    words = await get_words(session, url)
-
-    if links is None:
-        print(f"ON URL: {url} NOT FOUND LINKS!")
-        return
+async def create_crawl_job(
+        url: str,
+        max_depth: int = CRAWL_MAX_DEPTH,
+        concurrency: int = CRAWL_CONCURRENCY,
+        distributed: bool = False
+) -> CrawlFrontier:
+    root_url = canonicalize_url(url)
+    if root_url is None:
+        raise ValueError(f"Cannot crawl {url!r}: only absolute http(s) urls are supported")
+    seed_urls = [root_url] if max_depth > 0 else []
+    return await CrawlFrontier.create(root_url, max_depth, concurrency, seed_urls, distributed)
 
-    await store_links(links, url_model.id, db)
-    await store_words(words, url_model.id, db)
 
-    if links:
-        for link in links:
-            await crawl(link, db, session, depth=depth + 1)
+async def crawl(
+        url: str,
+        session: aiohttp.ClientSession,
+        max_depth: int = CRAWL_MAX_DEPTH,
+        concurrency: int = CRAWL_CONCURRENCY,
+        job_id: str | None = None
+) -> str:
+    if job_id is None:
+        frontier = await create_crawl_job(url, max_depth, concurrency)
     else:
-        print("NO LINKS")
-
-
-async def populate_matchrows(word1: str, word2: str, db: AsyncSession):
-    stmt1 = (
-        select(
-            WordLocation.fk_url_id.label("url_id"),
-            WordLocation.location.label("location"),
+        frontier = CrawlFrontier(job_id)
+        print(f"RUNNING CRAWL {job_id}")
+
+    async def worker():
+        while True:
+            item = await frontier.pop()
+            if item is None:
+                if not await frontier.pending():
+                    return
+                await frontier.reclaim_expired()
+                await asyncio.sleep(FRONTIER_POLL_INTERVAL)
+                continue
+            await crawl_frontier_item(frontier, item, max_depth, session, writer)
+
+    writer = create_writer()
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await writer.close()
+
+    await frontier.finish()
+    print(f"CRAWL {frontier.job_id} FINISHED")
+    return frontier.job_id
+
+
+async def resume_crawl(frontier: CrawlFrontier) -> None:
+    info = await frontier.info()
+    async with create_session() as session:
+        await crawl(
+            info["root_url"], session,
+            max_depth=int(info["max_depth"]),
+            concurrency=int(info["concurrency"]),
+            job_id=frontier.job_id
         )
-        .join(WordList, WordList.id == WordLocation.fk_word_id)
-        .where(WordList.word == word1)
-    )
-    result1 = await db.execute(stmt1)
-    rows1 = result1.fetchall()
-    print(f"rows1: {rows1}")
 
-    stmt2 = (
-        select(
-            WordLocation.fk_url_id.label("url_id"),
-            WordLocation.location.label("location"),
-        )
-        .join(WordList, WordList.id == WordLocation.fk_word_id)
-        .where(WordList.word == word2)
-    )
-    result2 = await db.execute(stmt2)
-    rows2 = result2.fetchall()
-    print(f"rows2: {rows2}")
-
-    word1_locations = defaultdict(list)
-    for row in rows1:
-        word1_locations[row.url_id].append(row.location)
-
-    word2_locations = defaultdict(list)
-    for row in rows2:
-        word2_locations[row.url_id].append(row.location)
-
-    common_url_ids = set(word1_locations.keys()) & set(word2_locations.keys())
-
-    for url_id in common_url_ids:
-        for loc1 in word1_locations[url_id]:
-            for loc2 in word2_locations[url_id]:
-                match_row = MatchRows(
-                    url_id=url_id,
-                    loc_word1=loc1,
-                    loc_word2=loc2,
-                )
-                db.add(match_row)
 
-    await db.commit()
+async def resume_crawls() -> list[asyncio.Task]:
+    tasks = []
+    for frontier in await CrawlFrontier.running_jobs():
+        if (await frontier.info()).get("distributed") == "1":
+            continue
+        task = asyncio.create_task(resume_crawl(frontier))
+        # the event loop only keeps weak references to tasks
+        crawl_tasks.add(task)
+        task.add_done_callback(crawl_tasks.discard)
+        tasks.append(task)
+    return tasks
 
-    print("MatchRows table populated successfully.")
 
+@dataclass
+class SearchResult:
+    url_id: int
+    frequency: int
+    location: int
+    distance: int
+    score: float = 0.0
+    url: str | None = None
 
 
+@dataclass(frozen=True)
+class ScoreWeights:
+    frequency: float = 1.0
+    location: float = 1.0
+    distance: float = 1.0
+    # only used for the stored metrics, combined with the frequency
+    pagerank: float = 1.0
 
-async def calc_metrics(db: AsyncSession, damping_factor=0.85, iterations=20):
-    freq_stmt = (
-        select(
-            MatchRows.url_id.label("url_id"),
-            (
-                func.count(func.distinct(MatchRows.loc_word1)) +
-                func.count(func.distinct(MatchRows.loc_word2))
-            ).label("metric_freq")
-        )
-        .group_by(MatchRows.url_id)
-    )
-    freq_result = await db.execute(freq_stmt)
-    frequency_data = freq_result.fetchall()
 
-    urls_stmt = select(LinkBetweenUrl.fk_fromurl_id).union(
-        select(LinkBetweenUrl.fk_tourl_id)
-    )
-    urls_result = await db.execute(urls_stmt)
-    urls = [row[0] for row in urls_result.fetchall()]
+DEFAULT_WEIGHTS = ScoreWeights()
 
-    num_urls = len(urls)
-    pagerank = {url: 1 / num_urls for url in urls}
 
-    links_stmt = (
-        select(LinkBetweenUrl.fk_fromurl_id, LinkBetweenUrl.fk_tourl_id)
-    )
-    links_result = await db.execute(links_stmt)
-    links = links_result.fetchall()
-
-    outgoing_links = {}
-    for from_url, to_url in links:
-        outgoing_links.setdefault(from_url, []).append(to_url)
-
-    for _ in range(iterations):
-        new_pagerank = {url: (1 - damping_factor) / num_urls for url in urls}
-        for from_url, to_urls in outgoing_links.items():
-            share = pagerank[from_url] / len(to_urls)
-            for to_url in to_urls:
-                if to_url in new_pagerank:
-                    new_pagerank[to_url] += damping_factor * share
-        pagerank = new_pagerank
-
-    max_pr = max(pagerank.values(), default=0)
-    min_pr = min(pagerank.values(), default=0)
-
-    if max_pr != min_pr:
-        normalized_pagerank = {
-            url: (pr - min_pr) / (max_pr - min_pr)
-            for url, pr in pagerank.items()
-        }
+def normalize_query(words: list[str]) -> list[str]:
+    query = []
+    for word in words:
+        word = word.strip().lower()
+        if word and word not in STOP_WORDS and word not in query:
+            query.append(word)
+    return query
+
+
+def intersect_sorted(lists: list[list[int]]) -> list[int]:
+    if not lists:
+        return []
+    lists = sorted(lists, key=len)
+    pointers = [0] * len(lists)
+    common = []
+    for value in lists[0]:
+        for i in range(1, len(lists)):
+            current = lists[i]
+            pointers[i] = bisect_left(current, value, pointers[i])
+            if pointers[i] == len(current):
+                return common
+            if current[pointers[i]] != value:
+                break
+        else:
+            common.append(value)
+    return common
+
+
+def min_distance(position_lists: list[list[int]]) -> int:
+    # smallest window of the page text that contains every query word
+    if len(position_lists) < 2:
+        return 0
+    heap = [(positions[0], i, 0) for i, positions in enumerate(position_lists)]
+    heapq.heapify(heap)
+    high = max(positions[0] for positions in position_lists)
+    best = high - heap[0][0]
+    while True:
+        low, i, j = heapq.heappop(heap)
+        best = min(best, high - low)
+        if j + 1 == len(position_lists[i]):
+            return best
+        position = position_lists[i][j + 1]
+        high = max(high, position)
+        heapq.heappush(heap, (position, i, j + 1))
+
+
+async def load_postings(
+        word_ids: list[int],
+        db: AsyncSession
+) -> dict[int, dict[int, list[int]]]:
+    if STORE_POSTING_LISTS:
+        stmt = (
+            select(WordPosting.fk_word_id, WordPosting.fk_url_id, WordPosting.locations)
+            .where(WordPosting.fk_word_id.in_(word_ids))
+            .order_by(WordPosting.fk_word_id, WordPosting.fk_url_id)
+        )
     else:
-        normalized_pagerank = {url: 0 for url in pagerank.keys()}
-
-    metrics = {}
-    for row in frequency_data:
-        metrics[row.url_id] = {"metric_freq": row.metric_freq}
-
-    for url_id, pr in pagerank.items():
-        if url_id in metrics:
-            metrics[url_id]["metric_pagerank"] = pr
-            metrics[url_id]["normal_metric_pagerank"] = normalized_pagerank[url_id]
+        stmt = (
+            select(
+                WordLocation.fk_word_id,
+                WordLocation.fk_url_id,
+                func.array_agg(aggregate_order_by(WordLocation.location, WordLocation.location))
+            )
+            .where(WordLocation.fk_word_id.in_(word_ids))
+            .group_by(WordLocation.fk_word_id, WordLocation.fk_url_id)
+            .order_by(WordLocation.fk_word_id, WordLocation.fk_url_id)
+        )
+    result = await db.execute(stmt)
 
-    freq_values = [data["metric_freq"] for data in metrics.values()]
-    freq_min, freq_max = min(freq_values), max(freq_values)
+    postings = {word_id: {} for word_id in word_ids}
+    for word_id, url_id, locations in result:
+        postings[word_id][url_id] = locations
+    return postings
 
-    for url_id, data in metrics.items():
-        data["normal_metric_freq"] = (
-            (data["metric_freq"] - freq_min) / (freq_max - freq_min) if freq_max != freq_min else 1
-        )
-        data["result_metric"] = (data["normal_metric_freq"] + data["normal_metric_pagerank"]) / 2
 
-    for url_id, data in metrics.items():
-        db.add(Metrics(
+def score_results(results: list[SearchResult], weights: ScoreWeights = DEFAULT_WEIGHTS) -> None:
+    if not results:
+        return
+    max_frequency = max(result.frequency for result in results) or 1
+    min_location = min(result.location for result in results)
+    min_distance_ = min(result.distance for result in results)
+    total_weight = (weights.frequency + weights.location + weights.distance) or 1
+    for result in results:
+        result.score = (
+            weights.frequency * result.frequency / max_frequency +
+            weights.location * (min_location + 1) / (result.location + 1) +
+            weights.distance * (min_distance_ + 1) / (result.distance + 1)
+        ) / total_weight
+
+
+async def rank_pages(
+        words: list[str],
+        db: AsyncSession,
+        limit: int | None = None,
+        weights: ScoreWeights = DEFAULT_WEIGHTS
+) -> list[SearchResult]:
+    query = normalize_query(words)
+    if not query:
+        return []
+
+    stmt = select(WordList.id, WordList.word).where(WordList.word.in_(query))
+    result = await db.execute(stmt)
+    word_ids = {word: word_id for word_id, word in result}
+    if len(word_ids) < len(query):
+        return []
+
+    ordered_ids = [word_ids[word] for word in query]
+    postings = await load_postings(ordered_ids, db)
+    url_ids = intersect_sorted([list(postings[word_id]) for word_id in ordered_ids])
+
+    results = []
+    for url_id in url_ids:
+        position_lists = [postings[word_id][url_id] for word_id in ordered_ids]
+        results.append(SearchResult(
             url_id=url_id,
-            metric_freq=data["metric_freq"],
-            metric_pagerank=data["metric_pagerank"],
-            normal_metric_freq=data["normal_metric_freq"],
-            normal_metric_pagerank=data["normal_metric_pagerank"],
-            result_metric=data["result_metric"]
+            frequency=sum(len(positions) for positions in position_lists),
+            location=sum(positions[0] for positions in position_lists),
+            distance=min_distance(position_lists)
         ))
 
-    await db.commit()
+    score_results(results, weights)
+    if limit is not None:
+        # a bounded heap keeps only the top of the ranking, stable like sort
+        return heapq.nlargest(limit, results, key=lambda r: r.score)
+    results.sort(key=lambda r: r.score, reverse=True)
+    return results
 
 
-async def get_sorted_metrics(db: AsyncSession):
-    stmt = (
-        select(
-            Metrics.url_id,
-            Metrics.result_metric
-        )
-        .order_by(Metrics.result_metric.desc())
+async def search_pages(
+        words: list[str],
+        db: AsyncSession,
+        limit: int = SEARCH_LIMIT,
+        offset: int = 0,
+        weights: ScoreWeights = DEFAULT_WEIGHTS
+) -> list[SearchResult]:
+    # terms are scored independently of their order, so the key sorts them
+    key = "search:" + json.dumps(
+        [sorted(normalize_query(words)), limit, offset, asdict(weights)], ensure_ascii=False
+    )
+    generation = await query_cache.current_generation()
+    cached = await query_cache.get(key, generation)
+    if cached is not None:
+        return [SearchResult(**row) for row in cached]
+
+    results = (await rank_pages(words, db, offset + limit, weights))[offset:]
+    if results:
+        stmt = select(UrlList.id, UrlList.url).where(UrlList.id.in_([r.url_id for r in results]))
+        urls = dict((await db.execute(stmt)).all())
+        for result in results:
+            result.url = urls.get(result.url_id)
+    await query_cache.set(key, [asdict(result) for result in results], generation)
+    return results
+
+
+async def load_link_graph(db: AsyncSession) -> tuple[np.ndarray, np.ndarray]:
+    # two aggregated arrays decode far faster than one row object per edge
+    stmt = select(
+        func.array_agg(LinkBetweenUrl.fk_fromurl_id),
+        func.array_agg(LinkBetweenUrl.fk_tourl_id)
+    )
+    from_ids, to_ids = (await db.execute(stmt)).one()
+    return (
+        np.asarray(from_ids or [], dtype=np.int64),
+        np.asarray(to_ids or [], dtype=np.int64)
     )
-    result = await db.execute(stmt)
-    return result.fetchall()
 
 
-async def fetch_text_from_url(url: str):
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    html = await response.text()
-                    soup = BeautifulSoup(html, "html.parser")
-                    return soup.get_text()
-                else:
-                    return f"Ошибка загрузки текста: {response.status}"
-        except Exception as e:
-            return f"Ошибка при подключении: {str(e)}"
+async def load_pagerank(db: AsyncSession) -> tuple[np.ndarray, np.ndarray]:
+    stmt = select(func.array_agg(PageRank.url_id), func.array_agg(PageRank.rank))
+    url_ids, ranks = (await db.execute(stmt)).one()
+    return (
+        np.asarray(url_ids or [], dtype=np.int64),
+        np.asarray(ranks or [], dtype=np.float64)
+    )
 
 
-def highlight_words(text, words):
-    for word in words:
-        regex = re.compile(re.escape(word), re.IGNORECASE)
-        text = regex.sub(f'<span class="highlight">{word}</span>', text)
-    return text
+async def store_pagerank(url_ids: np.ndarray, ranks: np.ndarray, db: AsyncSession) -> None:
+    rows = select(
+        func.unnest(bindparam("url_ids", type_=ARRAY(Integer))),
+        func.unnest(bindparam("ranks", type_=ARRAY(Float)))
+    )
+    stmt = pg_insert(PageRank).from_select([PageRank.url_id, PageRank.rank], rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PageRank.url_id],
+        set_={"rank": stmt.excluded.rank}
+    )
+    await db.execute(stmt, {"url_ids": url_ids.tolist(), "ranks": ranks.tolist()})
 
 
-async def generate_html_report(db: AsyncSession, output_file="report.html"):
-    sorted_metrics = await get_sorted_metrics(db)
-    words_to_highlight = ["деятельность", "редактора"]
+async def update_pagerank(
+        db: AsyncSession,
+        damping_factor: float = pagerank.DAMPING_FACTOR,
+        tolerance: float = pagerank.TOLERANCE,
+        max_iterations: int = pagerank.MAX_ITERATIONS,
+        incremental: bool = True
+) -> tuple[np.ndarray, np.ndarray]:
+    stmt = select(func.coalesce(func.max(LinkBetweenUrl.id), 0), func.count(LinkBetweenUrl.id))
+    edge_watermark, edge_count = (await db.execute(stmt)).one()
+    state = await db.get(PageRankState, PAGERANK_STATE_ID)
+
+    previous_ids = previous_ranks = None
+    if incremental and state is not None:
+        previous_ids, previous_ranks = await load_pagerank(db)
+        unchanged = state.edge_watermark == edge_watermark and state.edge_count == edge_count
+        if unchanged and previous_ids.size:
+            print("PAGERANK IS UP TO DATE")
+            return previous_ids, previous_ranks
+
+    from_ids, to_ids = await load_link_graph(db)
+    url_ids, ranks, iterations = pagerank.pagerank(
+        from_ids, to_ids, damping_factor, tolerance, max_iterations,
+        previous_ids, previous_ranks
+    )
+    print(f"PAGERANK CONVERGED AFTER {iterations} ITERATIONS")
+
+    await store_pagerank(url_ids, ranks, db)
+    stmt = pg_insert(PageRankState).values(
+        id=PAGERANK_STATE_ID,
+        edge_watermark=edge_watermark,
+        edge_count=edge_count,
+        iterations=iterations
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PageRankState.id],
+        set_={
+            "edge_watermark": stmt.excluded.edge_watermark,
+            "edge_count": stmt.excluded.edge_count,
+            "iterations": stmt.excluded.iterations,
+            "updated_at": func.now()
+        }
+    )
+    await db.execute(stmt)
+    return url_ids, ranks
 
-    html_content = "<html><head><style>.highlight { background-color: yellow; font-weight: bold; }</style></head><body>"
-    html_content += "<h1>URL Report</h1>"
 
-    for url_id, result_metric in sorted_metrics:
-        stmt = select(UrlList.url).where(UrlList.id == url_id)
-        result = await db.execute(stmt)
-        url = result.scalar()
+async def calc_metrics(
+        db: AsyncSession,
+        words: list[str],
+        damping_factor: float = pagerank.DAMPING_FACTOR,
+        tolerance: float = pagerank.TOLERANCE,
+        max_iterations: int = pagerank.MAX_ITERATIONS,
+        incremental: bool = True,
+        weights: ScoreWeights = DEFAULT_WEIGHTS
+):
+    # metrics are normalized against this query's matches only, so rows left
+    # by an earlier query would not be comparable: the table is replaced
+    await db.execute(delete(Metrics))
+    frequency_data = await rank_pages(words, db)
+    if not frequency_data:
+        await db.commit()
+        await query_cache.bump_generation()
+        return
 
+    url_ids, ranks = await update_pagerank(db, damping_factor, tolerance, max_iterations, incremental)
+    normal_ranks = pagerank.min_max_normalize(ranks)
 
-        text = await fetch_text_from_url(url)
+    positions = {url_id: i for i, url_id in enumerate(url_ids.tolist())}
+    metric_url_ids = [row.url_id for row in frequency_data]
+    rank_index = np.array([positions.get(url_id, -1) for url_id in metric_url_ids])
+    known = rank_index >= 0
+    metric_pagerank = np.where(known, ranks[rank_index], 0.0) if ranks.size else np.zeros(len(rank_index))
+    normal_metric_pagerank = (
+        np.where(known, normal_ranks[rank_index], 0.0) if ranks.size else np.zeros(len(rank_index))
+    )
 
-        highlighted_text = highlight_words(text, words_to_highlight)
+    metric_freq = np.array([row.frequency for row in frequency_data], dtype=np.int64)
+    freq_min, freq_max = metric_freq.min(), metric_freq.max()
+    normal_metric_freq = (
+        (metric_freq - freq_min) / (freq_max - freq_min) if freq_max != freq_min
+        else np.ones(len(metric_freq))
+    )
+    total_weight = (weights.frequency + weights.pagerank) or 1
+    result_metric = (
+        weights.frequency * normal_metric_freq + weights.pagerank * normal_metric_pagerank
+    ) / total_weight
+
+    rows = [
+        {
+            "url_id": url_id,
+            "metric_freq": freq,
+            "metric_pagerank": rank,
+            "normal_metric_pagerank": normal_rank,
+            "normal_metric_freq": normal_freq,
+            "result_metric": result
+        }
+        for url_id, freq, rank, normal_rank, normal_freq, result in zip(
+            metric_url_ids, metric_freq.tolist(), metric_pagerank.tolist(),
+            normal_metric_pagerank.tolist(), normal_metric_freq.tolist(), result_metric.tolist()
+        )
+    ]
+    for batch in chunked(rows, INSERT_BATCH_SIZE):
+        stmt = pg_insert(Metrics).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Metrics.url_id],
+            set_={
+                column: stmt.excluded[column]
+                for column in (
+                    "metric_freq", "metric_pagerank", "normal_metric_freq",
+                    "normal_metric_pagerank", "result_metric"
+                )
+            }
+        )
+        await db.execute(stmt)
+
+    await db.commit()
+    await query_cache.bump_generation()
 
-        html_content += f"<h2>URL: {url} (Metric: {result_metric})</h2>"
-        html_content += f"<div>{highlighted_text}</div>"
 
-    html_content += "</body></html>"
+async def get_sorted_metrics(
+        db: AsyncSession,
+        limit: int = METRICS_LIMIT,
+        offset: int = 0
+) -> list[tuple[int, float]]:
+    key = f"metrics:{limit}:{offset}"
+    generation = await query_cache.current_generation()
+    cached = await query_cache.get(key, generation)
+    if cached is not None:
+        return [tuple(row) for row in cached]
+
+    # served from the result_metric index, so only limit + offset rows are read
+    stmt = (
+        select(
+            Metrics.url_id,
+            Metrics.result_metric
+        )
+        .order_by(Metrics.result_metric.desc().nulls_last(), Metrics.url_id)
+        .limit(limit)
+        .offset(offset)
+    )
+    rows = [tuple(row) for row in (await db.execute(stmt)).all()]
+    await query_cache.set(key, rows, generation)
+    return rows
+
+
+@lru_cache(maxsize=HIGHLIGHT_CACHE_SIZE)
+def highlight_pattern(words: frozenset[str]) -> re.Pattern | None:
+    words = [word for word in words if word]
+    if not words:
+        return None
+    # longest first, so a term never loses to one of its own prefixes
+    alternation = "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+    return re.compile(alternation, re.IGNORECASE)
+
+
+def highlight_words(text: str, words: list[str]) -> str:
+    pattern = highlight_pattern(frozenset(words))
+    if pattern is None:
+        return html.escape(text)
+
+    parts = []
+    end = 0
+    for match in pattern.finditer(text):
+        parts.append(html.escape(text[end:match.start()]))
+        parts.append(f'<span class="highlight">{html.escape(match.group())}</span>')
+        end = match.end()
+    parts.append(html.escape(text[end:]))
+    return "".join(parts)
+
+
+async def generate_html_report(
+        limit: int = REPORT_LIMIT,
+        offset: int = 0,
+        words: list[str] | None = None
+) -> AsyncIterator[str]:
+    words_to_highlight = words or REPORT_HIGHLIGHT_WORDS
+    limit = min(limit, REPORT_MAX_LIMIT)
+    stmt = (
+        select(UrlList.url, Metrics.result_metric, PageText.text)
+        .select_from(Metrics)
+        .join(UrlList, UrlList.id == Metrics.url_id)
+        .outerjoin(PageText, PageText.url_id == Metrics.url_id)
+        .order_by(Metrics.result_metric.desc().nulls_last(), Metrics.url_id)
+        .limit(limit)
+        .offset(offset)
+    )
+
+    yield "<html><head><style>.highlight { background-color: yellow; font-weight: bold; }</style></head><body>"
+    yield "<h1>URL Report</h1>"
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(html_content)
+    # the generator outlives the request handler, so it owns its session
+    async with async_session() as db:
+        rows = await db.stream(stmt)
+        async for url, result_metric, text in rows:
+            highlighted_text = highlight_words(text or "", words_to_highlight)
+            yield f"<h2>URL: {html.escape(url)} (Metric: {result_metric})</h2><div>{highlighted_text}</div>"
 
-    print(f"HTML report generated: {output_file}")
+    yield "</body></html>"
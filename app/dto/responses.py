@@ -5,9 +5,45 @@ class CrawlerResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True, extra='ignore')
 
     message: str
+    job_id: str | None = None
 
 
 class GetLinksResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True, extra='ignore')
 
     links: list[str]
+
+
+class SearchResult(BaseModel):
+    model_config = ConfigDict(from_attributes=True, extra='ignore')
+
+    url_id: int
+    url: str | None
+    frequency: int
+    location: int
+    distance: int
+    score: float
+
+
+class MetricResponse(BaseModel):
+    url_id: int
+    result_metric: float | None
+
+
+class CrawlJobResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True, extra='ignore')
+
+    job_id: str
+    status: str
+    root_url: str
+    max_depth: int
+    concurrency: int
+    created_at: float
+    finished_at: float | None
+    pages_fetched: int
+    bytes_fetched: int
+    errors: int
+    skipped: int
+    queued: int
+    in_flight: int
+    pages_per_second: float
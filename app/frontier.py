@@ -0,0 +1,265 @@
+import asyncio
+import time
+import uuid
+
+from app.redis import redis_service
+
+ACTIVE_JOBS_KEY = "crawl:jobs:active"
+JOB_TTL = 7 * 24 * 60 * 60
+VISIBILITY_TIMEOUT = 5 * 60
+RECLAIM_BATCH_SIZE = 1000
+
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_CANCELLED = "cancelled"
+THROUGHPUT_WINDOW = 60
+
+URL_QUEUED = "queued"
+URL_IN_FLIGHT = "in_flight"
+URL_DONE = "done"
+URL_FAILED = "failed"
+
+# lease deadlines come from the redis clock, so workers with skewed clocks
+# never reclaim each other's live leases
+NOW = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+"""
+
+# pops the shallowest url and leases it in one step, so a crash can never
+# lose a url between the queue and the in-flight set; the in-flight entry is
+# "depth:token", so only the lease holder can extend or complete it
+POP_SCRIPT = NOW + """
+local item = redis.call('ZPOPMIN', KEYS[1])
+if #item == 0 then
+    return nil
+end
+redis.call('HSET', KEYS[2], item[1], item[2] .. ':' .. ARGV[3])
+redis.call('ZADD', KEYS[3], now + tonumber(ARGV[2]), item[1])
+redis.call('HSET', KEYS[4], item[1], ARGV[1])
+return item
+"""
+
+LEASE_HOLDER = """
+local entry = redis.call('HGET', KEYS[1], ARGV[1])
+if not entry or string.match(entry, ':(.*)$') ~= ARGV[2] then
+    return 0
+end
+"""
+
+# a lease that was reclaimed and handed to another worker is left alone
+COMPLETE_SCRIPT = LEASE_HOLDER + """
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[3])
+return 1
+"""
+
+EXTEND_SCRIPT = NOW + LEASE_HOLDER + """
+redis.call('ZADD', KEYS[2], 'XX', now + tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+# puts urls whose lease ran out (their worker died or hung) back on the queue
+RECLAIM_SCRIPT = NOW + """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, ARGV[1])
+for _, url in ipairs(expired) do
+    local entry = redis.call('HGET', KEYS[2], url)
+    redis.call('ZREM', KEYS[1], url)
+    redis.call('HDEL', KEYS[2], url)
+    if entry then
+        local depth = string.match(entry, '^([^:]*)')
+        redis.call('ZADD', KEYS[3], depth, url)
+        redis.call('HSET', KEYS[4], url, ARGV[2])
+    end
+end
+return #expired
+"""
+
+
+class CrawlFrontier:
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.job_key = f"crawl:job:{job_id}"
+        self.queue_key = f"crawl:{job_id}:queue"
+        self.in_flight_key = f"crawl:{job_id}:in_flight"
+        self.lease_key = f"crawl:{job_id}:leases"
+        self.state_key = f"crawl:{job_id}:state"
+        self.visited_key = f"crawl:{job_id}:visited"
+
+    @property
+    def redis(self):
+        return redis_service.redis_client
+
+    @classmethod
+    async def create(
+            cls,
+            root_url: str,
+            max_depth: int,
+            concurrency: int,
+            seed_urls: list[str] | None = None,
+            distributed: bool = False
+    ) -> "CrawlFrontier":
+        frontier = cls(uuid.uuid4().hex)
+        await frontier.redis.hset(frontier.job_key, mapping={
+            "root_url": root_url,
+            "max_depth": max_depth,
+            "concurrency": concurrency,
+            # distributed jobs are crawled by worker.py processes only
+            "distributed": int(distributed),
+            "status": JOB_RUNNING,
+            "created_at": time.time()
+        })
+        # seeded before it is listed as active: an idle worker that saw the
+        # job with an empty queue would finish it before the root was pushed
+        if seed_urls:
+            await frontier.push(seed_urls, 0)
+        await frontier.redis.sadd(ACTIVE_JOBS_KEY, frontier.job_id)
+        return frontier
+
+    @staticmethod
+    async def running_jobs() -> list["CrawlFrontier"]:
+        job_ids = await redis_service.redis_client.smembers(ACTIVE_JOBS_KEY)
+        return [CrawlFrontier(job_id) for job_id in sorted(job_ids)]
+
+    async def info(self) -> dict:
+        return await self.redis.hgetall(self.job_key)
+
+    async def status(self) -> str | None:
+        return await self.redis.hget(self.job_key, "status")
+
+    def _rate_key(self, second: int) -> str:
+        return f"crawl:{self.job_id}:rate:{second}"
+
+    async def push(self, urls: list[str], depth: int) -> list[str]:
+        # a cancelled job must not have its queue recreated by late workers
+        if await self.status() != JOB_RUNNING:
+            redis_service.forget_visited(self.visited_key)
+            return []
+        queued = await redis_service.cache_urls(urls, key=self.visited_key)
+        if queued:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.zadd(self.queue_key, {url: depth for url in queued}, nx=True)
+                pipe.hset(self.state_key, mapping={url: URL_QUEUED for url in queued})
+                await pipe.execute()
+        return queued
+
+    async def pop(self, visibility_timeout: float = VISIBILITY_TIMEOUT) -> tuple[str, int, str] | None:
+        token = uuid.uuid4().hex
+        item = await self.redis.eval(
+            POP_SCRIPT, 4,
+            self.queue_key, self.in_flight_key, self.lease_key, self.state_key,
+            URL_IN_FLIGHT, visibility_timeout, token
+        )
+        if not item:
+            return None
+        url, depth = item
+        return url, int(float(depth)), token
+
+    async def complete(self, url: str, token: str, failed: bool = False) -> bool:
+        return bool(await self.redis.eval(
+            COMPLETE_SCRIPT, 3,
+            self.in_flight_key, self.lease_key, self.state_key,
+            url, token, URL_FAILED if failed else URL_DONE
+        ))
+
+    async def extend(self, url: str, token: str, visibility_timeout: float = VISIBILITY_TIMEOUT) -> bool:
+        return bool(await self.redis.eval(
+            EXTEND_SCRIPT, 2,
+            self.in_flight_key, self.lease_key,
+            url, token, visibility_timeout
+        ))
+
+    def hold(self, url: str, token: str, visibility_timeout: float = VISIBILITY_TIMEOUT) -> asyncio.Task:
+        # a page can wait on a slow host's crawl-delay and then in the write
+        # queue for longer than one lease, so the holder keeps extending it
+        async def renew():
+            try:
+                while True:
+                    await asyncio.sleep(visibility_timeout / 3)
+                    if not await self.extend(url, token, visibility_timeout):
+                        return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"ERROR EXTENDING LEASE OF {url}: {e}")
+
+        return asyncio.create_task(renew())
+
+    async def reclaim_expired(self) -> int:
+        return await self.redis.eval(
+            RECLAIM_SCRIPT, 4,
+            self.lease_key, self.in_flight_key, self.queue_key, self.state_key,
+            RECLAIM_BATCH_SIZE, URL_QUEUED
+        )
+
+    async def record_page(self, size: int) -> None:
+        rate_key = self._rate_key(int(time.time()))
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hincrby(self.job_key, "pages_fetched", 1)
+            pipe.hincrby(self.job_key, "bytes_fetched", size)
+            pipe.incr(rate_key)
+            pipe.expire(rate_key, THROUGHPUT_WINDOW * 2)
+            await pipe.execute()
+
+    async def record_error(self) -> None:
+        await self.redis.hincrby(self.job_key, "errors", 1)
+
+    async def record_skipped(self) -> None:
+        await self.redis.hincrby(self.job_key, "skipped", 1)
+
+    async def stats(self) -> dict | None:
+        now = int(time.time())
+        # the current second is still filling up, so the window ends one before it
+        rate_keys = [self._rate_key(second) for second in range(now - THROUGHPUT_WINDOW, now)]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self.job_key)
+            pipe.zcard(self.queue_key)
+            pipe.hlen(self.in_flight_key)
+            pipe.mget(rate_keys)
+            info, queued, in_flight, rates = await pipe.execute()
+        if not info:
+            return None
+        return {
+            "job_id": self.job_id,
+            "status": info["status"],
+            "root_url": info["root_url"],
+            "max_depth": int(info["max_depth"]),
+            "concurrency": int(info["concurrency"]),
+            "created_at": float(info["created_at"]),
+            "finished_at": float(info["finished_at"]) if "finished_at" in info else None,
+            "pages_fetched": int(info.get("pages_fetched", 0)),
+            "bytes_fetched": int(info.get("bytes_fetched", 0)),
+            "errors": int(info.get("errors", 0)),
+            "skipped": int(info.get("skipped", 0)),
+            "queued": queued,
+            "in_flight": in_flight,
+            "pages_per_second": sum(int(rate) for rate in rates if rate) / THROUGHPUT_WINDOW
+        }
+
+    async def cancel(self) -> bool:
+        if await self.status() != JOB_RUNNING:
+            return False
+        await self.finish(JOB_CANCELLED)
+        return True
+
+    async def pending(self) -> int:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zcard(self.queue_key)
+            pipe.hlen(self.in_flight_key)
+            queued, in_flight = await pipe.execute()
+        return queued + in_flight
+
+    async def finish(self, status: str = JOB_DONE) -> None:
+        if await self.status() != JOB_RUNNING:
+            # another process finished it, but this one may still hold a filter
+            redis_service.forget_visited(self.visited_key)
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.job_key, mapping={"status": status, "finished_at": time.time()})
+            pipe.srem(ACTIVE_JOBS_KEY, self.job_id)
+            pipe.delete(self.queue_key, self.in_flight_key, self.lease_key)
+            for key in (self.job_key, self.state_key, self.visited_key):
+                pipe.expire(key, JOB_TTL)
+            await pipe.execute()
+        redis_service.forget_visited(self.visited_key)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float
+from sqlalchemy import Column, Integer, BigInteger, String, Text, ForeignKey, Float, Index, DateTime, func, text
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -8,27 +9,44 @@ class UrlList(Base):
     __tablename__ = 'urllist'
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String, unique=True, nullable=False)
+    etag = Column(String)
+    last_modified = Column(String)
+    content_hash = Column(String(64))
+    charset = Column(String)
+    fetched_at = Column(DateTime)
+    simhash = Column(BigInteger)
+    duplicate_of = Column(Integer, ForeignKey('urllist.id'))
 
 
 class WordList(Base):
     __tablename__ = 'wordlist'
     id = Column(Integer, primary_key=True, index=True)
-    word = Column(String, nullable=False)
+    word = Column(String, unique=True, nullable=False)
 
 
 class WordLocation(Base):
     __tablename__ = 'wordlocation'
+    __table_args__ = (
+        Index('ix_wordlocation_word_url_location', 'fk_word_id', 'fk_url_id', 'location'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     fk_word_id = Column(Integer, ForeignKey('wordlist.id'), nullable=False)
-    fk_url_id = Column(Integer, ForeignKey('urllist.id'), nullable=False)
+    fk_url_id = Column(Integer, ForeignKey('urllist.id'), nullable=False, index=True)
     location = Column(Integer)
 
 
+class WordPosting(Base):
+    __tablename__ = 'wordposting'
+    fk_word_id = Column(Integer, ForeignKey('wordlist.id'), primary_key=True)
+    fk_url_id = Column(Integer, ForeignKey('urllist.id'), primary_key=True, index=True)
+    locations = Column(ARRAY(Integer), nullable=False)
+
+
 class LinkBetweenUrl(Base):
     __tablename__ = 'linkbetweenurl'
     id = Column(Integer, primary_key=True, index=True)
-    fk_fromurl_id = Column(Integer, ForeignKey('urllist.id'), nullable=False)
-    fk_tourl_id = Column(Integer, ForeignKey('urllist.id'), nullable=False)
+    fk_fromurl_id = Column(Integer, ForeignKey('urllist.id'), nullable=False, index=True)
+    fk_tourl_id = Column(Integer, ForeignKey('urllist.id'), nullable=False, index=True)
 
 
 class LinkWord(Base):
@@ -49,11 +67,35 @@ class MatchRows(Base):
 
 class Metrics(Base):
     __tablename__ = 'metrics'
+    __table_args__ = (
+        Index('ix_metrics_result_metric_url', text('result_metric desc nulls last'), 'url_id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
 
-    url_id = Column(Integer, ForeignKey('urllist.id'), nullable=False)
+    url_id = Column(Integer, ForeignKey('urllist.id'), nullable=False, unique=True)
     metric_freq = Column(Integer, nullable=False)
     metric_pagerank = Column(Float, nullable=False)
     normal_metric_freq = Column(Float)
     normal_metric_pagerank = Column(Float)
     result_metric = Column(Float)
+
+
+class PageRank(Base):
+    __tablename__ = 'pagerank'
+    url_id = Column(Integer, ForeignKey('urllist.id'), primary_key=True)
+    rank = Column(Float, nullable=False)
+
+
+class PageRankState(Base):
+    __tablename__ = 'pagerankstate'
+    id = Column(Integer, primary_key=True)
+    edge_watermark = Column(Integer, nullable=False)
+    edge_count = Column(Integer, nullable=False)
+    iterations = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class PageText(Base):
+    __tablename__ = 'pagetext'
+    url_id = Column(Integer, ForeignKey('urllist.id'), primary_key=True)
+    text = Column(Text, nullable=False)
@@ -0,0 +1,98 @@
+import numpy as np
+from scipy import sparse
+
+DAMPING_FACTOR = 0.85
+TOLERANCE = 1e-6
+MAX_ITERATIONS = 100
+
+
+def build_transition_matrix(
+        sources: np.ndarray,
+        targets: np.ndarray,
+        num_nodes: int
+) -> tuple[sparse.csr_matrix, np.ndarray]:
+    out_degree = np.bincount(sources, minlength=num_nodes).astype(np.float64)
+    weights = 1.0 / out_degree[sources]
+    # column-stochastic: entry (to, from) carries the share of "from" sent to "to";
+    # duplicate edges are summed, so parallel links count as extra votes
+    matrix = sparse.csr_matrix(
+        (weights, (targets, sources)),
+        shape=(num_nodes, num_nodes)
+    )
+    return matrix, out_degree == 0
+
+
+def power_iteration(
+        matrix: sparse.csr_matrix,
+        dangling: np.ndarray,
+        damping_factor: float = DAMPING_FACTOR,
+        tolerance: float = TOLERANCE,
+        max_iterations: int = MAX_ITERATIONS,
+        start: np.ndarray | None = None
+) -> tuple[np.ndarray, int]:
+    num_nodes = matrix.shape[0]
+    if num_nodes == 0:
+        return np.zeros(0), 0
+
+    if start is None:
+        rank = np.full(num_nodes, 1.0 / num_nodes)
+    else:
+        rank = start / start.sum()
+    teleport = (1.0 - damping_factor) / num_nodes
+
+    for iteration in range(1, max_iterations + 1):
+        # rank held by pages without outgoing links is spread over every page
+        dangling_mass = rank[dangling].sum()
+        new_rank = damping_factor * (matrix @ rank + dangling_mass / num_nodes) + teleport
+        delta = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if delta < tolerance:
+            break
+
+    return rank, iteration
+
+
+def warm_start(
+        url_ids: np.ndarray,
+        previous_ids: np.ndarray,
+        previous_ranks: np.ndarray
+) -> np.ndarray:
+    # pages seen in the previous run keep their rank, new pages start uniform
+    start = np.full(len(url_ids), 1.0 / len(url_ids))
+    positions = np.searchsorted(url_ids, previous_ids)
+    known = positions < len(url_ids)
+    known[known] = url_ids[positions[known]] == previous_ids[known]
+    start[positions[known]] = previous_ranks[known]
+    return start
+
+
+def pagerank(
+        from_ids: np.ndarray,
+        to_ids: np.ndarray,
+        damping_factor: float = DAMPING_FACTOR,
+        tolerance: float = TOLERANCE,
+        max_iterations: int = MAX_ITERATIONS,
+        previous_ids: np.ndarray | None = None,
+        previous_ranks: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray, int]:
+    url_ids, inverse = np.unique(np.concatenate([from_ids, to_ids]), return_inverse=True)
+    sources, targets = inverse[:len(from_ids)], inverse[len(from_ids):]
+
+    start = None
+    if previous_ids is not None and previous_ids.size and url_ids.size:
+        start = warm_start(url_ids, previous_ids, previous_ranks)
+
+    matrix, dangling = build_transition_matrix(sources, targets, len(url_ids))
+    rank, iterations = power_iteration(
+        matrix, dangling, damping_factor, tolerance, max_iterations, start
+    )
+    return url_ids, rank, iterations
+
+
+def min_max_normalize(values: np.ndarray) -> np.ndarray:
+    if values.size == 0:
+        return values
+    low, high = values.min(), values.max()
+    if high == low:
+        return np.zeros_like(values)
+    return (values - low) / (high - low)
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+
+from bs4 import BeautifulSoup
+from bs4.dammit import EncodingDetector
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    import lxml.html
+    import lxml.etree
+except ImportError:
+    lxml = None
+
+# None picks the fastest backend that is installed
+PARSER_BACKEND: str | None = None
+SKIPPED_TAGS = ("script", "style", "noscript", "template")
+# malformed markup or an unknown charset: the next parser gets a try
+PARSER_ERRORS = (ValueError, LookupError) + ((lxml.etree.LxmlError,) if lxml is not None else ())
+
+
+@dataclass
+class ParsedHtml:
+    hrefs: list[str]
+    text: str
+
+
+def parse_with_selectolax(body: bytes, encoding: str | None) -> ParsedHtml:
+    # lexbor reads bytes as utf-8 and ignores <meta charset>, so the
+    # declared encoding has to be found before handing it the document
+    encoding = encoding or EncodingDetector.find_declared_encoding(body, is_html=True)
+    tree = SelectolaxParser(body.decode(encoding, errors="replace") if encoding else body)
+    hrefs = [node.attributes.get("href") for node in tree.css("a[href]")]
+    tree.strip_tags(list(SKIPPED_TAGS))
+    text = tree.root.text(separator=" ") if tree.root is not None else ""
+    return ParsedHtml(hrefs=[href for href in hrefs if href], text=text)
+
+
+def parse_with_lxml(body: bytes, encoding: str | None) -> ParsedHtml:
+    parser = lxml.html.HTMLParser(encoding=encoding, remove_comments=True)
+    document = lxml.html.document_fromstring(body, parser=parser)
+    hrefs = document.xpath("//a/@href")
+    lxml.etree.strip_elements(document, *SKIPPED_TAGS, with_tail=False)
+    return ParsedHtml(hrefs=[str(href) for href in hrefs], text=" ".join(document.itertext()))
+
+
+def parse_with_html_parser(body: bytes, encoding: str | None) -> ParsedHtml:
+    soup = BeautifulSoup(body, "html.parser", from_encoding=encoding)
+    hrefs = [a_tag["href"] for a_tag in soup.find_all("a", href=True)]
+    for tag in soup(SKIPPED_TAGS):
+        tag.decompose()
+    return ParsedHtml(hrefs=hrefs, text=soup.get_text(separator=" "))
+
+
+BACKENDS = {
+    "selectolax": parse_with_selectolax,
+    "lxml": parse_with_lxml,
+    "html.parser": parse_with_html_parser,
+}
+
+
+def available_backends() -> list[str]:
+    backends = []
+    if SelectolaxParser is not None:
+        backends.append("selectolax")
+    if lxml is not None:
+        backends.append("lxml")
+    backends.append("html.parser")
+    return backends
+
+
+def parse_html(body: bytes, encoding: str | None = None, backend: str | None = PARSER_BACKEND) -> ParsedHtml:
+    backends = [backend] if backend else available_backends()
+    if "html.parser" not in backends:
+        backends.append("html.parser")
+
+    for name in backends:
+        try:
+            return BACKENDS[name](body, encoding)
+        except PARSER_ERRORS as e:
+            print(f"PARSER {name} FAILED: {e}")
+    return ParsedHtml(hrefs=[], text="")
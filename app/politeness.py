@@ -0,0 +1,133 @@
+import asyncio
+import time
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+from app.lru import LRUCache
+
+USER_AGENT = "Mozilla/5"
+CONNECTOR_LIMIT = 200
+CONNECTOR_LIMIT_PER_HOST = 8
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 30
+REQUEST_TIMEOUT = 30
+HOST_RATE = 2.0
+HOST_BURST = 4
+ROBOTS_TTL = 60 * 60
+# per-host state is cheap to rebuild, so only recently used hosts keep it
+HOST_CACHE_SIZE = 10_000
+
+
+def create_session(
+        limit: int = CONNECTOR_LIMIT,
+        limit_per_host: int = CONNECTOR_LIMIT_PER_HOST
+) -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        headers={"User-Agent": USER_AGENT}
+    )
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostScheduler:
+    def __init__(
+            self,
+            rate: float = HOST_RATE,
+            burst: int = HOST_BURST,
+            obey_robots: bool = True,
+            cache_size: int = HOST_CACHE_SIZE
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.obey_robots = obey_robots
+        # host -> TokenBucket, (RobotFileParser | None, fetched_at) and asyncio.Lock
+        self.buckets = LRUCache(cache_size)
+        self.robots = LRUCache(cache_size)
+        self.robots_locks = LRUCache(cache_size)
+
+    async def _fetch_robots(self, session: aiohttp.ClientSession, origin: str) -> RobotFileParser | None:
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        try:
+            async with session.get(parser.url) as response:
+                if response.status in (401, 403):
+                    parser.disallow_all = True
+                elif response.status == 200:
+                    parser.parse((await response.text(errors="ignore")).splitlines())
+                else:
+                    return None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+        return parser
+
+    async def get_robots(self, session: aiohttp.ClientSession, url: str) -> RobotFileParser | None:
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        cached = self.robots.get(host)
+        if cached and time.monotonic() - cached[1] < ROBOTS_TTL:
+            return cached[0]
+
+        # one robots.txt request per host even when many workers arrive at once
+        lock = self.robots_locks.get(host)
+        if lock is None:
+            lock = asyncio.Lock()
+            self.robots_locks.set(host, lock)
+        async with lock:
+            cached = self.robots.get(host)
+            if cached and time.monotonic() - cached[1] < ROBOTS_TTL:
+                return cached[0]
+            parser = await self._fetch_robots(session, f"{parsed.scheme}://{parsed.netloc}")
+            self.robots.set(host, (parser, time.monotonic()))
+            self.buckets.pop(host, None)
+            return parser
+
+    async def allowed(self, session: aiohttp.ClientSession, url: str) -> bool:
+        if not self.obey_robots:
+            return True
+        parser = await self.get_robots(session, url)
+        return parser is None or parser.can_fetch(USER_AGENT, url)
+
+    def _bucket(self, host: str) -> TokenBucket:
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            rate, burst = self.rate, self.burst
+            parser = self.robots.get(host, (None, 0))[0]
+            delay = parser.crawl_delay(USER_AGENT) if parser is not None else None
+            if delay:
+                rate, burst = min(rate, 1 / float(delay)), 1
+            bucket = TokenBucket(rate, burst)
+            self.buckets.set(host, bucket)
+        return bucket
+
+    async def wait(self, url: str) -> None:
+        await self._bucket(urlparse(url).netloc.lower()).acquire()
+
+
+host_scheduler = HostScheduler()
@@ -0,0 +1,75 @@
+import json
+import time
+from typing import Any
+
+from app.lru import LRUCache
+from app.redis import redis_service
+
+INDEX_GENERATION_KEY = "index:generation"
+QUERY_CACHE_SIZE = 10_000
+QUERY_CACHE_TTL = 10 * 60
+GENERATION_REFRESH_INTERVAL = 1.0
+
+
+class QueryCache:
+    def __init__(self, size: int = QUERY_CACHE_SIZE, use_redis: bool = True):
+        self.local = LRUCache(size)
+        self.use_redis = use_redis
+        self.generation = 0
+        self.generation_checked_at = float("-inf")
+
+    def _redis(self):
+        return redis_service.redis_client if self.use_redis else None
+
+    def _set_generation(self, generation: int) -> None:
+        if generation != self.generation:
+            # entries of older generations can never be hit again
+            self.local.clear()
+            self.generation = generation
+        self.generation_checked_at = time.monotonic()
+
+    async def current_generation(self) -> int:
+        # other processes bump the counter too, but asking redis at most once
+        # per interval keeps hits local; results may be that much stale
+        client = self._redis()
+        if client is not None and time.monotonic() - self.generation_checked_at >= GENERATION_REFRESH_INTERVAL:
+            self._set_generation(int(await client.get(INDEX_GENERATION_KEY) or 0))
+        return self.generation
+
+    async def bump_generation(self) -> None:
+        client = self._redis()
+        if client is None:
+            self._set_generation(self.generation + 1)
+        else:
+            self._set_generation(await client.incr(INDEX_GENERATION_KEY))
+
+    @staticmethod
+    def _redis_key(generation: int, key: str) -> str:
+        return f"query:{generation}:{key}"
+
+    async def get(self, key: str, generation: int) -> Any | None:
+        value = self.local.get(key) if generation == self.generation else None
+        if value is not None:
+            return value
+
+        client = self._redis()
+        if client is None:
+            return None
+        data = await client.get(self._redis_key(generation, key))
+        if data is None:
+            return None
+        value = json.loads(data)
+        if generation == self.generation:
+            self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any, generation: int) -> None:
+        # a result computed before a bump must not be served as current
+        if generation == self.generation:
+            self.local.set(key, value)
+        client = self._redis()
+        if client is not None:
+            await client.set(self._redis_key(generation, key), json.dumps(value), ex=QUERY_CACHE_TTL)
+
+
+query_cache = QueryCache()
@@ -1,24 +1,68 @@
 import redis.asyncio as redis
 
+from app.bloom import BloomFilter
+
 redis_client = None
 
+BLOOM_CAPACITY = 1_000_000
+BLOOM_ERROR_RATE = 0.001
+
 
 class RedisService:
-    def __init__(self, url: str):
+    def __init__(self, url: str, use_bloom_filter: bool = True):
         self.redis_client = None
         self.url = url
+        # a local filter only ever answers "maybe seen", which is trusted as
+        # seen: at BLOOM_ERROR_RATE a new url is occasionally skipped in
+        # exchange for most visited checks never reaching redis
+        self.use_bloom_filter = use_bloom_filter
+        self.bloom_filters: dict[str, BloomFilter] = {}
 
     async def init_redis(self):
         self.redis_client = redis.from_url(self.url, decode_responses=True)
 
-    async def cache_url(self, url: str):
-        return await self.redis_client.sadd("visited_urls", url)
+    def _bloom_filter(self, key: str) -> BloomFilter | None:
+        if not self.use_bloom_filter:
+            return None
+        if key not in self.bloom_filters:
+            self.bloom_filters[key] = BloomFilter(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+        bloom_filter = self.bloom_filters[key]
+        # a saturated filter would skip more and more new urls, so from then
+        # on redis alone decides what was visited
+        return None if bloom_filter.full else bloom_filter
+
+    async def cache_url(self, url: str, key: str = "visited_urls"):
+        return bool(await self.cache_urls([url], key=key))
+
+    async def cache_urls(self, urls: list[str], key: str = "visited_urls") -> list[str]:
+        bloom_filter = self._bloom_filter(key)
+        candidates = list(dict.fromkeys(
+            url for url in urls if bloom_filter is None or url not in bloom_filter
+        ))
+        if not candidates:
+            return []
+
+        # SADD reports whether the member was new, so one pipelined round trip
+        # both checks and marks every url of the batch atomically per url
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for url in candidates:
+                pipe.sadd(key, url)
+            added = await pipe.execute()
+
+        if bloom_filter is not None:
+            for url in candidates:
+                bloom_filter.add(url)
+        return [url for url, is_new in zip(candidates, added) if is_new]
+
+    async def is_url_cached(self, url: str, key: str = "visited_urls"):
+        return await self.redis_client.sismember(key, url)
 
-    async def is_url_cached(self, url: str):
-        return await self.redis_client.sismember("visited_urls", url)
+    def forget_visited(self, key: str) -> None:
+        self.bloom_filters.pop(key, None)
 
-    async def delete_visited_urls(self):
-        return await self.redis_client.delete("visited_urls")
+    async def delete_visited_urls(self, key: str = "visited_urls"):
+        self.forget_visited(key)
+        return await self.redis_client.delete(key)
 
 
 
@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+
+from sqlalchemy import select, delete, exists
+
+from app.content_store import content_store
+from app.crawler import Page, parse_page, get_parser_pool, shutdown_parser_pool, write_pages, PARSER_WORKERS
+from app.database import async_session
+from app.models import UrlList, WordList, WordLocation, WordPosting, LinkWord
+from app.redis import redis_service
+
+REINDEX_BATCH_SIZE = 500
+
+
+def reparse_page(url: str, content_hash: str, charset: str | None) -> Page | None:
+    # runs in the parser pool, so reading and decompressing spread across cores too
+    body = content_store.get(content_hash)
+    if body is None:
+        return None
+    return parse_page(body, url, charset)
+
+
+async def reparse_pages(rows) -> list[Page | None]:
+    if not PARSER_WORKERS:
+        return [reparse_page(row.url, row.content_hash, row.charset) for row in rows]
+    loop = asyncio.get_running_loop()
+    pool = get_parser_pool()
+    return await asyncio.gather(*(
+        loop.run_in_executor(pool, reparse_page, row.url, row.content_hash, row.charset)
+        for row in rows
+    ))
+
+
+async def load_batch(after_id: int, batch_size: int):
+    stmt = (
+        select(
+            UrlList.id, UrlList.url, UrlList.etag, UrlList.last_modified,
+            UrlList.content_hash, UrlList.charset, UrlList.fetched_at
+        )
+        .where(
+            UrlList.id > after_id,
+            UrlList.content_hash.is_not(None),
+            UrlList.duplicate_of.is_(None)
+        )
+        .order_by(UrlList.id)
+        .limit(batch_size)
+    )
+    async with async_session() as db:
+        return (await db.execute(stmt)).all()
+
+
+async def prune_words() -> None:
+    stmt = delete(WordList).where(
+        ~exists().where(WordLocation.fk_word_id == WordList.id),
+        ~exists().where(WordPosting.fk_word_id == WordList.id),
+        ~exists().where(LinkWord.fk_word_id == WordList.id)
+    )
+    async with async_session() as db:
+        result = await db.execute(stmt)
+        await db.commit()
+    print(f"PRUNED {result.rowcount} UNUSED WORDS")
+
+
+async def reindex(batch_size: int = REINDEX_BATCH_SIZE, prune: bool = False) -> None:
+    after_id = 0
+    indexed = 0
+    missing = 0
+    # store_pages invalidates cached query results through redis
+    await redis_service.init_redis()
+    try:
+        while rows := await load_batch(after_id, batch_size):
+            after_id = rows[-1].id
+            pages = []
+            for row, page in zip(rows, await reparse_pages(rows)):
+                if page is None:
+                    missing += 1
+                    continue
+                page.etag = row.etag
+                page.last_modified = row.last_modified
+                page.content_hash = row.content_hash
+                page.charset = row.charset
+                page.fetched_at = row.fetched_at
+                pages.append(page)
+            if pages:
+                await write_pages(pages)
+            indexed += len(pages)
+            print(f"REINDEXED {indexed} PAGES, {missing} MISSING FROM CONTENT STORE")
+    finally:
+        shutdown_parser_pool()
+
+    if prune:
+        await prune_words()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the word index from the local content store")
+    parser.add_argument("--batch-size", type=int, default=REINDEX_BATCH_SIZE)
+    parser.add_argument(
+        "--prune-words", action="store_true",
+        help="delete words no page uses any more; stop crawl workers and the API first, "
+             "anything still crawling fails one write batch before it reloads its word ids"
+    )
+    args = parser.parse_args()
+    asyncio.run(reindex(args.batch_size, args.prune_words))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import hashlib
+
+import numpy as np
+
+from app.redis import redis_service
+
+SHINGLE_SIZE = 4
+FINGERPRINT_BITS = 64
+MAX_HAMMING_DISTANCE = 3
+# with at most 3 differing bits, two fingerprints that are near-duplicates
+# must agree on at least one of 4 bands (pigeonhole principle)
+BANDS = MAX_HAMMING_DISTANCE + 1
+BAND_BITS = FINGERPRINT_BITS // BANDS
+FINGERPRINT_URLS_KEY = "simhash:urls"
+
+BIT_SHIFTS = np.arange(FINGERPRINT_BITS, dtype=np.uint64)
+
+
+def shingle_hashes(words: list[str], size: int = SHINGLE_SIZE) -> np.ndarray:
+    count = len(words) - size + 1
+    hashes = np.empty(max(count, 0), dtype=np.uint64)
+    for i in range(count):
+        shingle = " ".join(words[i:i + size]).encode()
+        hashes[i] = int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "little")
+    return hashes
+
+
+def simhash(words: list[str], size: int = SHINGLE_SIZE) -> int | None:
+    hashes = shingle_hashes(words, size)
+    if not hashes.size:
+        return None
+    bits = (hashes[:, None] >> BIT_SHIFTS) & np.uint64(1)
+    # each bit of the fingerprint is the majority vote of that bit over all shingles
+    votes = 2 * bits.sum(axis=0, dtype=np.int64) - len(hashes)
+    return int(sum(1 << i for i in np.flatnonzero(votes > 0).tolist()))
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def bands(fingerprint: int) -> list[int]:
+    mask = (1 << BAND_BITS) - 1
+    return [(fingerprint >> (i * BAND_BITS)) & mask for i in range(BANDS)]
+
+
+def to_signed(fingerprint: int) -> int:
+    # postgres bigint is signed
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+
+class SimHashIndex:
+    @property
+    def redis(self):
+        return redis_service.redis_client
+
+    @staticmethod
+    def band_key(band: int, value: int) -> str:
+        return f"simhash:{band}:{value}"
+
+    async def find_duplicate(self, fingerprint: int, url: str) -> str | None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for band, value in enumerate(bands(fingerprint)):
+                pipe.smembers(self.band_key(band, value))
+            candidates = set().union(*await pipe.execute())
+
+        close = [
+            candidate for candidate in map(int, candidates)
+            if hamming_distance(candidate, fingerprint) <= MAX_HAMMING_DISTANCE
+        ]
+        if not close:
+            return None
+        close.sort(key=lambda candidate: hamming_distance(candidate, fingerprint))
+        urls = await self.redis.hmget(FINGERPRINT_URLS_KEY, [str(candidate) for candidate in close])
+        for duplicate_url in urls:
+            if duplicate_url and duplicate_url != url:
+                return duplicate_url
+        return None
+
+    async def add(self, fingerprint: int, url: str) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for band, value in enumerate(bands(fingerprint)):
+                pipe.sadd(self.band_key(band, value), fingerprint)
+            # first page with a fingerprint owns it; later copies point to it
+            pipe.hsetnx(FINGERPRINT_URLS_KEY, str(fingerprint), url)
+            await pipe.execute()
+
+
+simhash_index = SimHashIndex()
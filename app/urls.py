@@ -0,0 +1,106 @@
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit, unquote_plus, SplitResult
+
+CANONICAL_CACHE_SIZE = 100_000
+BASE_CACHE_SIZE = 1024
+ALLOWED_SCHEMES = {"http", "https"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = {
+    "gclid", "dclid", "fbclid", "yclid", "msclkid", "mc_cid", "mc_eid",
+    "_openstat", "_ga", "_gl", "igshid", "ysclid",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_query(query: str) -> str:
+    # pairs keep their original encoding, so a bare "flag" never becomes "flag="
+    pairs = [
+        pair for pair in query.split("&")
+        if pair and not is_tracking_param(unquote_plus(pair.split("=", 1)[0]))
+    ]
+    return "&".join(sorted(pairs))
+
+
+def canonicalize_parts(parts: SplitResult) -> str | None:
+    scheme = parts.scheme.lower()
+    if scheme not in ALLOWED_SCHEMES or not parts.hostname:
+        return None
+
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    netloc = parts.hostname.rstrip(".")
+    if ":" in netloc:
+        # hostname drops the brackets around ipv6 literals
+        netloc = f"[{netloc}]"
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+
+    query = canonicalize_query(parts.query) if parts.query else ""
+    # fragments only move within a page, so they are dropped
+    return urlunsplit((scheme, netloc, parts.path.rstrip("/"), query, ""))
+
+
+@lru_cache(maxsize=CANONICAL_CACHE_SIZE)
+def canonicalize_url(url: str) -> str | None:
+    url = url.strip()
+    if url.startswith("//"):
+        url = "https:" + url
+    return canonicalize_parts(urlsplit(url))
+
+
+@lru_cache(maxsize=BASE_CACHE_SIZE)
+def split_base(base_url: str) -> SplitResult:
+    # every link of a page resolves against the same base
+    return urlsplit(base_url)
+
+
+def remove_dot_segments(path: str) -> str:
+    segments = path.split("/")
+    output = []
+    for segment in segments:
+        if segment == ".":
+            continue
+        if segment == "..":
+            if len(output) > 1:
+                output.pop()
+            continue
+        output.append(segment)
+    if segments[-1] in (".", ".."):
+        output.append("")
+    return "/".join(output)
+
+
+def resolve_reference(base: SplitResult, ref: SplitResult) -> SplitResult:
+    # RFC 3986 section 5.2.2 for a reference without a scheme
+    if ref.netloc:
+        return ref._replace(scheme=base.scheme, path=remove_dot_segments(ref.path))
+    if not ref.path:
+        return base._replace(query=ref.query or base.query, fragment=ref.fragment)
+    if ref.path.startswith("/"):
+        path = ref.path
+    elif base.netloc and not base.path:
+        path = "/" + ref.path
+    else:
+        path = base.path[:base.path.rfind("/") + 1] + ref.path
+    return SplitResult(base.scheme, base.netloc, remove_dot_segments(path), ref.query, ref.fragment)
+
+
+def canonicalize_link(href: str, base_url: str) -> str | None:
+    href = href.strip()
+    if href.lower().startswith(("http://", "https://")):
+        return canonicalize_url(href)
+    if href.startswith("#"):
+        return None
+    # the href is split once and resolved against the already split base
+    ref = urlsplit(href)
+    if ref.scheme:
+        # mailto:, javascript:, tel:, data: and other non-http schemes
+        return None
+    return canonicalize_parts(resolve_reference(split_base(base_url), ref))
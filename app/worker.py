@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import time
+
+from app.crawler import (
+    crawl_frontier_item, create_writer, shutdown_parser_pool, CRAWL_CONCURRENCY, FRONTIER_POLL_INTERVAL
+)
+from app.frontier import CrawlFrontier
+from app.politeness import create_session
+from app.redis import redis_service
+from app.writer import ResultWriter
+
+JOBS_REFRESH_INTERVAL = 5.0
+
+
+class JobDirectory:
+    def __init__(self, refresh_interval: float = JOBS_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.jobs: list[tuple[CrawlFrontier, int]] = []
+        self.refreshed_at = 0.0
+        self.lock = asyncio.Lock()
+        self.cursor = 0
+
+    async def get(self) -> list[tuple[CrawlFrontier, int]]:
+        async with self.lock:
+            if time.monotonic() - self.refreshed_at >= self.refresh_interval:
+                jobs = []
+                for frontier in await CrawlFrontier.running_jobs():
+                    info = await frontier.info()
+                    if info:
+                        jobs.append((frontier, int(info["max_depth"])))
+                # jobs that left the active set no longer need their filters here
+                running = {frontier.job_id for frontier, _ in jobs}
+                for frontier, _ in self.jobs:
+                    if frontier.job_id not in running:
+                        redis_service.forget_visited(frontier.visited_key)
+                self.jobs = jobs
+                self.refreshed_at = time.monotonic()
+            # rotate so every worker does not hammer the same job first
+            self.cursor += 1
+            if not self.jobs:
+                return []
+            offset = self.cursor % len(self.jobs)
+            return self.jobs[offset:] + self.jobs[:offset]
+
+    async def idle(self) -> None:
+        for frontier, _ in await self.get():
+            await frontier.reclaim_expired()
+            if not await frontier.pending():
+                await frontier.finish()
+                print(f"CRAWL {frontier.job_id} FINISHED")
+
+
+async def worker_loop(directory: JobDirectory, session, writer: ResultWriter) -> None:
+    while True:
+        for frontier, max_depth in await directory.get():
+            item = await frontier.pop()
+            if item is not None:
+                await crawl_frontier_item(frontier, item, max_depth, session, writer)
+                break
+        else:
+            await directory.idle()
+            await asyncio.sleep(FRONTIER_POLL_INTERVAL)
+
+
+async def run_worker(concurrency: int = CRAWL_CONCURRENCY) -> None:
+    await redis_service.init_redis()
+    directory = JobDirectory()
+    print(f"CRAWL WORKER STARTED WITH CONCURRENCY {concurrency}")
+    writer = create_writer()
+    try:
+        async with create_session() as session:
+            await asyncio.gather(*(
+                worker_loop(directory, session, writer) for _ in range(concurrency)
+            ))
+    finally:
+        await writer.close()
+        shutdown_parser_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consume crawl jobs from the shared Redis frontier")
+    parser.add_argument("--concurrency", type=int, default=CRAWL_CONCURRENCY)
+    args = parser.parse_args()
+    asyncio.run(run_worker(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
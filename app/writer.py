@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+WRITE_QUEUE_SIZE = 500
+WRITE_BATCH_SIZE = 50
+WRITE_FLUSH_INTERVAL = 1.0
+
+Callback = Callable[[bool], Awaitable[None]]
+
+
+class ResultWriter:
+    def __init__(
+            self,
+            store: Callable[[list], Awaitable[None]],
+            queue_size: int = WRITE_QUEUE_SIZE,
+            batch_size: int = WRITE_BATCH_SIZE,
+            flush_interval: float = WRITE_FLUSH_INTERVAL
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # bounded, so fetchers block in put() once the database falls behind
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: asyncio.Task | None = None
+
+    def start(self) -> "ResultWriter":
+        self.task = asyncio.create_task(self._run())
+        return self
+
+    async def put(self, item: Any, callback: Callback | None = None) -> None:
+        await self.queue.put((item, callback))
+
+    async def close(self) -> None:
+        if self.task is None:
+            return
+        await self.queue.put(None)
+        await self.task
+        self.task = None
+
+    async def _collect(self) -> tuple[list, bool]:
+        batch = [await self.queue.get()]
+        if batch[0] is None:
+            return [], True
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                entry = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if entry is None:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    async def _run(self) -> None:
+        closing = False
+        while not closing:
+            batch, closing = await self._collect()
+            if batch:
+                await self._flush(batch)
+
+    async def _write(self, batch: list) -> list[bool]:
+        try:
+            await self.store([item for item, _ in batch])
+            return [True] * len(batch)
+        except Exception as e:
+            print(f"ERROR WRITING BATCH OF {len(batch)}: {e}")
+            if len(batch) == 1:
+                return [False]
+        # split the failed batch, so one bad item does not fail its neighbours
+        middle = len(batch) // 2
+        return await self._write(batch[:middle]) + await self._write(batch[middle:])
+
+    async def _flush(self, batch: list) -> None:
+        results = await self._write(batch)
+        for (_, callback), ok in zip(batch, results):
+            if callback is not None:
+                try:
+                    await callback(ok)
+                except Exception as e:
+                    print(f"ERROR IN WRITE CALLBACK: {e}")
@@ -0,0 +1,5 @@
+from app.reindex import main
+
+
+if __name__ == "__main__":
+    main()
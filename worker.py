@@ -0,0 +1,5 @@
+from app.worker import main
+
+
+if __name__ == "__main__":
+    main()